@@ -1,17 +1,28 @@
 # app.py — refactored with sidebar filters, no expanders
 
-import os
 import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, wait
 from datetime import datetime
 from collections import defaultdict
 
 import requests
 import streamlit as st
 
-from db_google import get_all_books, update_book_metadata_full
-from covers_google import get_cached_or_drive_cover
+from db_google import get_all_books, update_book_metadata_full, update_cover_previews
+from covers_google import (
+    cover_pending, get_cached_or_drive_cover, is_cached_cover, missing_cover_previews, prefetch_covers,
+    revalidate_covers,
+)
+from cover_cache import compose_sprite, cover_key, store as cover_store
 from charts_view import show_charts, show_extreme_books
 from enrichment import enrich_book_metadata
+from ol_dates import ol_date_key, ol_year
+from fuzzy_index import LibraryIndex, shared_catalog_index
+from search_as_you_type import IncrementalSearch, PrefixCache
+from openlibrary_local import editions_page_url, fetch_json
+from http_guard import reset_all as reset_http_guard, status_snapshot
+from ol_warmer import CacheWarmer
+import scheduler
 
 
 # =========================
@@ -63,7 +74,7 @@ st.title("📚 Book Tracker")
 # ------------------------------------------------------------
 def load_books():
     try:
-        data = get_all_books()
+        data = scheduler.call("google", get_all_books)
     except Exception as e:
         st.error(f"⚠️ Could not load books: {e}")
         st.stop()
@@ -96,6 +107,72 @@ with st.sidebar.expander("⚙️ Claude API Key", expanded=not st.session_state[
     if entered_key != st.session_state["anthropic_api_key"]:
         st.session_state["anthropic_api_key"] = entered_key
 
+@st.cache_resource(show_spinner=False)
+def ol_cache_warmer() -> CacheWarmer:
+    """One background warmer per server process (its editions page size matches MAX_LIMIT below)."""
+    return CacheWarmer(editions_limit=1000)
+
+with st.sidebar.expander("🩺 Upstream status"):
+    guard = status_snapshot()
+    st.caption(
+        f"Negative cache: {guard['negative_cache']['entries']} entries, "
+        f"{guard['negative_cache']['hits']} hits · "
+        f"Response cache: {guard['response_cache']['entries']} entries "
+        f"({guard['response_cache']['bytes'] / 1e6:.1f} MB), {guard['response_cache']['hits']} hits"
+    )
+    warm = st.checkbox(
+        "Warm OpenLibrary cache in background",
+        key="_ol_warm",
+        help="Prefetch works, editions, authors and cover availability for books already in the "
+             "library. Runs only while you are not searching.",
+    )
+    warmer = ol_cache_warmer()
+    if warm:
+        warmer.add_books(books)
+        warmer.start()
+    elif warmer.running:
+        warmer.stop()
+    if warm or warmer.stats["visited"]:
+        w = warmer.snapshot()
+        st.caption(
+            f"Warmer: {w['state']} · {w['visited']}/{w['books']} books · "
+            f"{w['requests']} requests · {w['already_warm']} already cached"
+            + (f" · {w['errors']} skipped (last: {w['last_error']})" if w["errors"] else "")
+        )
+    if guard["breakers"]:
+        st.dataframe(
+            [{"endpoint": name, **state} for name, state in guard["breakers"].items()],
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.caption("No external calls yet.")
+    covers = cover_store().snapshot()
+    st.caption(
+        f"Cover cache: {covers['keys']} covers in {covers['blobs']} files, "
+        f"{covers['bytes'] / 1e6:.1f} / {covers['max_bytes'] / 1e6:.0f} MB · "
+        f"{covers['hits']} hits, {covers['misses']} misses, {covers['evictions']} evicted, "
+        f"{covers['placeholders']} placeholders · "
+        f"{covers['webp_variants']} WebP thumbnails saved {covers['webp_saved_bytes'] / 1e6:.1f} MB"
+    )
+    if covers.get("pack", {}).get("needs_compaction"):
+        st.caption("Thumbnail pack is mostly evicted entries: run `python cover_pack.py compact` while the app is stopped.")
+    if st.button("Revalidate cached covers", key="_revalidate_covers",
+                 help="Re-check covers not verified in a week (conditional requests; unchanged ones cost no download)"):
+        revalidate_covers()
+    sched = scheduler.status_snapshot()
+    if sched["upstreams"]:
+        st.dataframe(
+            [{"upstream": name, **state} for name, state in sched["upstreams"].items()],
+            hide_index=True,
+            use_container_width=True,
+        )
+    for job in sched["jobs"]:
+        st.caption(f"{job['job']}: {job['state']} · {job['done']}/{job['total']} done, {job['failed']} failed")
+    if st.button("Reset breakers & cache", key="_reset_http_guard"):
+        reset_http_guard()
+        st.rerun()
+
 def safe_str(x):
     """Normalize all values to clean strings."""
     if x is None:
@@ -118,6 +195,30 @@ authors = sorted({safe_str(b.get("author", "")) for b in books if b.get("author"
 titles = sorted({safe_str(b.get("title", "")) for b in books if b.get("title")})
 
 
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_library_index(entries: tuple) -> LibraryIndex:
+    """Trigram index over (id, title, author, date_finished); rebuilt only when the library changes."""
+    return LibraryIndex(
+        {"id": i, "title": t, "author": a, "date_finished": d} for i, t, a, d in entries
+    )
+
+
+library_index = build_library_index(
+    tuple(
+        (safe_str(b.get("id")), safe_str(b.get("title")), safe_str(b.get("author")), safe_str(b.get("date_finished")))
+        for b in books
+    )
+)
+
+f_find = st.sidebar.text_input(
+    "Find in my library", key="f_find", placeholder="title or author, typos OK"
+)
+cover_grid = st.sidebar.checkbox(
+    "Cover grid", key="cover_grid",
+    help="Show each month's covers as one combined image instead of one image per book",
+)
+
+
 f_years = st.sidebar.multiselect("Year finished", years, key="f_years")
 f_months = st.sidebar.multiselect("Month finished", months, key="f_months")
 f_authors = st.sidebar.multiselect("Author", authors, key="f_authors")
@@ -137,7 +238,7 @@ reset_filters = st.sidebar.button("Reset Filters", type="primary")
 if reset_filters:
     for k in [
         "f_years", "f_months", "f_authors", "f_titles",
-        "f_genre", "f_tags", "f_type", "f_gender"
+        "f_genre", "f_tags", "f_type", "f_gender", "f_find"
     ]:
         st.session_state.pop(k, None)
 
@@ -171,33 +272,22 @@ if apply_filters:
 
 books = st.session_state["filtered_books"]
 
+if f_find.strip():
+    found_ids = {hit["id"] for _, hit in library_index.find(f_find.strip())}
+    books = [b for b in books if safe_str(b.get("id")) in found_ids]
+
 # ------------------------------------------------------------
 # OPENLIBRARY ADD-BOOK SECTION
 # ------------------------------------------------------------
-DATE_FORMATS = [
-    "%Y",
-    "%b %d, %Y",
-    "%B %d, %Y",
-    "%Y-%m-%d",
-    "%m/%d/%Y",
-    "%B %Y",
-    "%b %Y",
-]
 COVER_SIZE = "M"
 MAX_LIMIT = 1000
 SLEEP_TIME = 0.35
 TOP_RESULTS = 10
-
-
-def _parse_ol_date(date_str):
-    if not date_str:
-        return datetime(1, 1, 1)
-    for fmt in DATE_FORMATS:
-        try:
-            return datetime.strptime(str(date_str).strip(), fmt)
-        except ValueError:
-            continue
-    return datetime(9999, 12, 31)
+SEARCH_PAGE = 50  # fetched per remote search so longer queries can be narrowed locally
+# Request/keep only what the picker reads; OpenLibrary docs carry dozens of unused fields
+SEARCH_FIELDS = "key,title,title_suggest,author_name,first_publish_year"
+EDITION_FIELDS = ("key", "title", "publish_date", "number_of_pages", "publishers", "languages",
+                  "isbn_13", "isbn13", "isbn_10", "isbn10", "identifiers")
 
 
 def _get_cover_url_from_edition_key(edition_key, size=COVER_SIZE):
@@ -223,15 +313,22 @@ def _first_isbn(ed):
     return ""
 
 
-@st.cache_data(show_spinner=False, ttl=300)
-def ol_search_works(q: str):
-    url = f"https://openlibrary.org/search.json?q={requests.utils.quote(q)}"
-    r = requests.get(url, timeout=15)
-    r.raise_for_status()
-    data = r.json()
+def ol_search_page(q: str):
+    """One search.json page for q, normalized for the picker, plus OpenLibrary's numFound."""
+    url = (
+        f"https://openlibrary.org/search.json?q={requests.utils.quote(q)}"
+        f"&limit={SEARCH_PAGE}&fields={SEARCH_FIELDS}"
+    )
+    data = scheduler.call("openlibrary", fetch_json, url, timeout=15)
     docs = data.get("docs", [])
+    num_found = data.get("numFound", len(docs))
+    if not docs:
+        # Typo fallback: fuzzy match against the local OpenLibrary catalog, if one was imported
+        idx = shared_catalog_index()
+        docs = [d for _, d in idx.search(q, limit=TOP_RESULTS, min_score=0.5)] if idx else []
+        num_found = len(docs)
     out = []
-    for d in docs[: TOP_RESULTS * 2]:
+    for d in docs:
         out.append(
             {
                 "work_id": (d.get("key") or "").split("/")[-1],
@@ -240,25 +337,30 @@ def ol_search_works(q: str):
                 "first_publish_year": d.get("first_publish_year") or "",
             }
         )
-    return out[:TOP_RESULTS]
+    return out, num_found
+
+
+@st.cache_resource(show_spinner=False)
+def search_prefix_cache() -> PrefixCache:
+    """Query → results cache shared by every session (prefix extensions get a provisional local filter)."""
+    return PrefixCache(ttl=300)
 
 
 @st.cache_data(show_spinner=True, ttl=300)
 def ol_fetch_editions_sorted(work_id: str):
-    base = "https://openlibrary.org"
     offset = 0
     all_editions = []
     total_size = float("inf")
 
     while offset < total_size:
-        url = f"{base}/works/{work_id}/editions.json?limit={MAX_LIMIT}&offset={offset}"
-        r = requests.get(url, timeout=20)
-        r.raise_for_status()
-        payload = r.json()
+        url = editions_page_url(work_id, MAX_LIMIT, offset)
+        payload = scheduler.call("openlibrary", fetch_json, url, timeout=20)
         entries = payload.get("entries", []) or []
         if not entries:
             break
-        all_editions.extend(entries)
+        # editions.json has no field projection; slim each entry right away so the
+        # cached result (and the pages held while paging) stay small
+        all_editions.extend({k: e[k] for k in EDITION_FIELDS if k in e} for e in entries)
         total_size = payload.get("size", 0) or 0
         offset += len(entries)
         time.sleep(SLEEP_TIME)
@@ -270,7 +372,7 @@ def ol_fetch_editions_sorted(work_id: str):
         is_english = langs and english_key in langs
         unspecified = langs is None or len(langs) == 0
         if is_english or unspecified:
-            ed["_sort_date"] = _parse_ol_date(ed.get("publish_date"))
+            ed["_sort_date"] = ol_date_key(ed.get("publish_date"))
             filtered.append(ed)
 
     filtered_sorted = sorted(filtered, key=lambda e: e["_sort_date"])
@@ -303,6 +405,20 @@ st.session_state.setdefault("ol_results", [])
 st.session_state.setdefault("ol_selected_work", None)
 st.session_state.setdefault("ol_editions", [])
 st.session_state.setdefault("last_added_id", None)
+st.session_state.setdefault("ol_shelved_hit", None)
+if "ol_searcher" not in st.session_state:
+    st.session_state["ol_searcher"] = IncrementalSearch(ol_search_page, search_prefix_cache())
+searcher = st.session_state["ol_searcher"]
+
+
+def _on_query_change(index: LibraryIndex, searcher: IncrementalSearch):
+    q = st.session_state.get("add_query", "").strip()
+    st.session_state["ol_selected_work"] = None
+    st.session_state["ol_editions"] = []
+    # Skip the remote search when the book is clearly already shelved
+    shelved = index.shelved_match(q) if q else None
+    st.session_state["ol_shelved_hit"] = {**shelved[1], "query": q} if shelved else None
+    searcher.submit("" if shelved else q)
 
 # ---- UI ----
 st.markdown("### ➕ Add a Book")
@@ -311,22 +427,39 @@ add_book_container = st.container()
 with add_book_container:
     st.markdown('<div id="add-book-area">', unsafe_allow_html=True)
 
-    # Search form
-    with st.form("book_search_form"):
-        query = st.text_input(
-            "Search OpenLibrary (title or author)",
-            key="add_query",
-            placeholder="e.g., The Dead Zone",
-        )
-        submitted = st.form_submit_button("Search")
-
-        if submitted and query.strip():
-            try:
-                st.session_state["ol_results"] = ol_search_works(query.strip())
-                st.session_state["ol_selected_work"] = None
-                st.session_state["ol_editions"] = []
-            except Exception as e:
+    # Enter (or leaving the field) searches at once; a new search supersedes the previous one,
+    # and repeated queries are answered from the shared cache for 5 minutes.
+    st.text_input(
+        "Search OpenLibrary (title or author)",
+        key="add_query",
+        placeholder="e.g., The Dead Zone",
+        on_change=_on_query_change,
+        args=(library_index, searcher),
+    )
+    if searcher.query and not st.session_state["ol_selected_work"]:
+        try:
+            with st.spinner("Searching OpenLibrary…"):
+                # Show what an earlier, shorter query already found until this search answers
+                early = st.empty()
+                provisional = searcher.provisional()[:TOP_RESULTS]
+                if provisional:
+                    early.caption("  ·  ".join(f"{r['title']} — {r['author']}" for r in provisional))
+                st.session_state["ol_results"] = searcher.results(timeout=30)[:TOP_RESULTS]
+                early.empty()
+        except Exception as e:
+            st.session_state["ol_results"] = []
+            if not isinstance(e, CancelledError):
                 st.error(f"OpenLibrary search failed: {e}")
+
+    hit = st.session_state.get("ol_shelved_hit")
+    if hit:
+        st.info(
+            f"Already in your library: **{hit['title']}** — {hit['author']}"
+            + (f" (finished {hit['date_finished']})" if hit.get("date_finished") else "")
+        )
+        if st.button("Search OpenLibrary anyway", key="ol_search_anyway"):
+            st.session_state["ol_shelved_hit"] = None
+            searcher.submit(hit["query"])
             st.rerun()
 
     # Results: Works
@@ -390,11 +523,7 @@ with add_book_container:
                     from db_google import add_book
 
                     # Normalize values
-                    pub_year = (ed.get("publish_date") or "")[:4]
-                    try:
-                        pub_year = int(pub_year) if pub_year else ""
-                    except ValueError:
-                        pub_year = ""
+                    pub_year = ol_year(ed.get("publish_date")) or ""
 
                     pages = ed.get("pages")
                     try:
@@ -422,13 +551,14 @@ with add_book_container:
                         else "",
                     }
                     try:
-                        add_book(book_data)
+                        scheduler.call("google", add_book, book_data)
                         st.success(f"Added: {book_data['title']} ({date_finished})")
 
                         # Reset search state and remember new book
                         st.session_state["ol_results"] = []
                         st.session_state["ol_selected_work"] = None
                         st.session_state["ol_editions"] = []
+                        searcher.submit("")
                         st.session_state["last_added_id"] = (
                             book_data["isbn"] or book_data["title"]
                         )
@@ -517,6 +647,54 @@ def toggle(label: str, key: str, default: bool = False):
     st.markdown("<hr style='margin:2px 0;'>", unsafe_allow_html=True)
 
 
+COVER_WAIT = 15  # seconds the finished page waits for background cover downloads before refreshing
+COVER_POLL = 0.5  # slice of that wait between checks for user interaction
+pending_covers = []
+new_previews = {}  # book id -> inline preview not yet saved with the book
+
+
+@st.cache_resource(show_spinner=False)
+def queued_preview_writes() -> set:
+    """Book ids whose preview write-back was already queued by any session."""
+    return set()
+
+
+def preview_html(b, width: int) -> str:
+    """The book's stored inline preview (painted with the page, no extra request), or ""."""
+    preview = b.get("cover_preview")
+    return f'<img class="cover-preview" src="{preview}" width="{width}" alt="">' if preview else ""
+
+SPRITE_COLUMNS = 10
+# With static serving on (.streamlit/config.toml), covers are <img> tags on immutable URLs the
+# browser caches, instead of st.image payloads re-sent on every rerun
+STATIC_COVERS = bool(st.get_option("server.enableStaticServing"))
+
+
+def render_cover(b, size: str, width: int, download: bool = False) -> bool:
+    """Show b's cached cover at `width` px; False if there is none (yet)."""
+    cover = get_cached_or_drive_cover(b, size, download=download)
+    if not is_cached_cover(cover):
+        return False
+    url = cover_store().static_url(cover_key(b.get("cover_url"), b.get("isbn")), size) if STATIC_COVERS else None
+    if url:
+        # The preview is the <img> background until the browser has the thumbnail
+        preview = b.get("cover_preview")
+        style = f' class="cover-img" style="background-image:url({preview})"' if preview else ""
+        st.markdown(f'<img src="{url}" width="{width}"{style} alt="">', unsafe_allow_html=True)
+    else:
+        st.image(cover, width=width)
+    return True
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def month_cover_sprite(covers: tuple) -> bytes:
+    """covers = ((cover_key, content_hash or None), ...): the hashes make this per library version."""
+    return compose_sprite(
+        [cover_store().image(key, "list") if digest else None for key, digest in covers],
+        columns=SPRITE_COLUMNS,
+    )
+
+
 # Library structure
 for y in sorted(grouped.keys(), reverse=True):
     year_total = sum(len(v) for v in grouped[y].values())
@@ -531,6 +709,28 @@ for y in sorted(grouped.keys(), reverse=True):
             toggle(label, m_key, default=(y == RECENT_Y and m == RECENT_M))
 
             if st.session_state[m_key]:
+                # Missing covers download in the background; placeholders render until they land
+                pending_covers.extend(prefetch_covers(month_books))
+                new_previews.update(missing_cover_previews(month_books))
+                if cover_grid:
+                    keys = [cover_key(b.get("cover_url"), b.get("isbn")) for b in month_books]
+                    if STATIC_COVERS:
+                        # One HTML block; each <img> is a browser-cached static file
+                        tiles = [cover_store().static_url(k, "list") for k in keys]
+                        st.markdown(
+                            '<div class="cover-grid">' + "".join(
+                                f'<img src="{u}" alt="">' if u
+                                else preview_html(b, 60) or '<div class="cover-placeholder"></div>'
+                                for u, b in zip(tiles, month_books)
+                            ) + "</div>",
+                            unsafe_allow_html=True,
+                        )
+                    else:
+                        n = min(len(keys), SPRITE_COLUMNS)
+                        st.image(
+                            month_cover_sprite(tuple((k, cover_store().digest(k)) for k in keys)),
+                            width=n * 60 + (n - 1) * 4,
+                        )
                 for idx, b in enumerate(month_books):
                     unique = f"{y}_{m}_{idx}_{b.get('id','x')}"
                     detail_key = f"detail_open_{unique}"
@@ -543,13 +743,18 @@ for y in sorted(grouped.keys(), reverse=True):
                     if detail_key not in st.session_state:
                         st.session_state[detail_key] = False
 
-                    cols = st.columns([1, 5])
-                    with cols[0]:
-                        cover = get_cached_or_drive_cover(b)
-                        if isinstance(cover, str) and os.path.exists(cover):
-                            st.image(cover, width=60)
-                        else:
-                            st.caption("No cover")
+                    if cover_grid:
+                        cols = [None, st.container()]  # covers are in the month's grid image
+                    else:
+                        cols = st.columns([1, 5])
+                        with cols[0]:
+                            if not render_cover(b, "list", 60):
+                                if b.get("cover_preview"):
+                                    st.markdown(preview_html(b, 60), unsafe_allow_html=True)
+                                elif cover_pending(b):
+                                    st.markdown('<div class="cover-placeholder"></div>', unsafe_allow_html=True)
+                                else:
+                                    st.caption("No cover")
 
                     with cols[1]:
                         title = b.get("title", "Untitled")
@@ -575,8 +780,7 @@ for y in sorted(grouped.keys(), reverse=True):
                     
                         cols_d = st.columns([1, 3])
                         with cols_d[0]:
-                            if cover and os.path.exists(cover):
-                                st.image(cover, width=180)
+                            render_cover(b, "detail", 180, download=True)
                     
                         with cols_d[1]:
                     
@@ -614,7 +818,9 @@ for y in sorted(grouped.keys(), reverse=True):
                                     if st.button("💾 Save", key=f"save_{unique}"):
                     
                                         try:
-                                            update_book_metadata_full(
+                                            scheduler.call(
+                                                "google",
+                                                update_book_metadata_full,
                                                 b.get("id"),
                                                 b.get("title"),
                                                 b.get("author"),
@@ -632,7 +838,7 @@ for y in sorted(grouped.keys(), reverse=True):
                     
                                             # Reload from Google Sheets
                                             st.cache_data.clear()
-                                            all_books = get_all_books()
+                                            all_books = scheduler.call("google", get_all_books)
                     
                                             updated = next((bk for bk in all_books if str(bk.get("id")) == str(b.get("id"))), None)
                                             if updated:
@@ -690,7 +896,9 @@ for y in sorted(grouped.keys(), reverse=True):
                                         "cover_url": b.get("cover_url"),
                                     }
 
-                                    enriched = enrich_book_metadata(
+                                    enriched = scheduler.call(
+                                        "anthropic",
+                                        enrich_book_metadata,
                                         b.get("title"),
                                         b.get("author"),
                                         b.get("isbn"),
@@ -706,7 +914,9 @@ for y in sorted(grouped.keys(), reverse=True):
                                             b[k] = v
 
                                     try:
-                                        update_book_metadata_full(
+                                        scheduler.call(
+                                            "google",
+                                            update_book_metadata_full,
                                             b.get("id"),
                                             b.get("title"),
                                             b.get("author"),
@@ -724,7 +934,7 @@ for y in sorted(grouped.keys(), reverse=True):
 
                                         # Reload single book from sheet
                                         st.cache_data.clear()
-                                        all_books = get_all_books()
+                                        all_books = scheduler.call("google", get_all_books)
                                         updated = next(
                                             (
                                                 bk
@@ -749,3 +959,22 @@ for y in sorted(grouped.keys(), reverse=True):
                         if st.button("Hide details", key=f"hide_{unique}"):
                             st.session_state[detail_key] = False
                             st.rerun()
+
+# Save previews of newly cached covers with their books (one batched write per rerun)
+new_previews = {k: v for k, v in new_previews.items() if k not in queued_preview_writes()}
+if new_previews:
+    queued_preview_writes().update(new_previews)
+    scheduler.submit("google", update_cover_previews, new_previews, priority=scheduler.BACKGROUND)
+
+# Page is fully drawn; once some pending covers have landed, rerun so they replace the placeholders.
+# Wait in short slices and touch a placeholder between them: Streamlit only stops a run for a newer
+# user interaction at one of its own calls, so a click is never held up by this wait.
+if pending_covers:
+    cover_tick = st.empty()
+    deadline = time.monotonic() + COVER_WAIT
+    while time.monotonic() < deadline:
+        done, _ = wait(pending_covers, timeout=COVER_POLL, return_when=FIRST_COMPLETED)
+        if done:
+            wait(pending_covers, timeout=COVER_POLL)  # let near-simultaneous downloads share one refresh
+            st.rerun()
+        cover_tick.empty()
@@ -1,30 +1,21 @@
+import os
+import sys
 import sqlite3
-import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openlibrary_local import normalize_isbn, resolve_isbns
 
 DB_FILE = "books.db"
 
-def fetch_openlibrary_id(isbn):
-    url = f"https://openlibrary.org/api/books?bibkeys=ISBN:{isbn}&format=json&jscmd=data"
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-
-    data = r.json()
-    entry = data.get(f"ISBN:{isbn}")
-    if not entry:
-        return None
-
-    # Attempt to extract a works-style ID (e.g., from the URL)
-    identifiers = entry.get("identifiers", {})
-    olids = identifiers.get("openlibrary", [])
-    if olids:
-        return olids[0].replace("/works/", "").replace("/books/", "")
-    
-    # fallback: extract from URL if available
-    if "url" in entry and "/works/" in entry["url"]:
-        return entry["url"].split("/works/")[1].strip("/")
-    
-    return None
+def _olid(entry):
+    # Same preference as before: edition OLID first, then the work
+    key = entry.get("edition_key") or entry.get("work_key") or ""
+    return key.replace("/works/", "").replace("/books/", "") or None
+
+def fetch_openlibrary_ids(isbns):
+    """Resolve many ISBNs at once; returns {isbn: olid} for the ones OpenLibrary knows."""
+    resolved, _ = resolve_isbns(isbns)
+    return {isbn: _olid(entry) for isbn, entry in resolved.items() if _olid(entry)}
 
 def backfill_openlibrary_ids():
     with sqlite3.connect(DB_FILE) as conn:
@@ -32,21 +23,26 @@ def backfill_openlibrary_ids():
         cursor.execute("SELECT id, title, isbn FROM books WHERE (openlibrary_id IS NULL OR openlibrary_id = '') AND isbn IS NOT NULL AND isbn != ''")
         rows = cursor.fetchall()
 
-        updated = 0
+        todo = []
         for book_id, title, raw_isbn in rows:
             isbn_raw = raw_isbn.strip().split(",")[0]
             isbn = isbn_raw if len(isbn_raw) > 10 else isbn_raw.zfill(10)
+            todo.append((book_id, title, isbn))
+
+        olids = fetch_openlibrary_ids([isbn for _, _, isbn in todo])
 
-            olid = fetch_openlibrary_id(isbn)
+        updates = []
+        for book_id, title, isbn in todo:
+            olid = olids.get(normalize_isbn(isbn))
             if olid:
                 print(f"✅ {title} → {isbn} → {olid}")
-                cursor.execute("UPDATE books SET openlibrary_id = ? WHERE id = ?", (olid, book_id))
-                updated += 1
+                updates.append((olid, book_id))
             else:
                 print(f"❌ {title} → {isbn} → no OLID found")
 
+        cursor.executemany("UPDATE books SET openlibrary_id = ? WHERE id = ?", updates)
         conn.commit()
-        print(f"✅ Backfilled {updated} OpenLibrary ID(s)")
+        print(f"✅ Backfilled {len(updates)} OpenLibrary ID(s)")
 
 if __name__ == "__main__":
     backfill_openlibrary_ids()
@@ -0,0 +1,196 @@
+# backfill_covers.py
+# Find books whose cover is missing (or was cached as OpenLibrary's 1×1 placeholder), look for a real
+# cover on OpenLibrary, cache it locally (optionally copying it to Drive), and write the new cover
+# URLs back to the backend in one bulk update. Replaces archive/backfill_covers_from_isbn.py.
+#
+#   - availability is checked with HEAD …?default=false (404 = no cover) before anything is downloaded
+#   - checks and downloads run concurrently as one background Job on the scheduler's OpenLibrary pool
+#   - progress is checkpointed to backfill_covers.checkpoint.json, so an interrupted run resumes where
+#     it stopped; books that failed (network errors) are simply retried next run
+#
+# Usage:
+#   python backfill_covers.py                    # Google Sheet (what the app uses)
+#   python backfill_covers.py --backend sqlite   # books.db
+#   python backfill_covers.py --drive --dry-run
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+
+import scheduler
+from cover_cache import atomic_write, cover_key, store
+from covers_google import get_local_cover, save_covers_to_drive
+from http_guard import NEGATIVE_CACHE, breaker_for, is_failure_status
+from openlibrary_local import COVER_BASE, normalize_isbn
+
+CHECKPOINT = os.path.join(os.path.dirname(__file__), "backfill_covers.checkpoint.json")
+CHECKPOINT_EVERY = 25  # results between checkpoint writes
+
+
+def _backend(name: str):
+    if name == "sqlite":
+        import db_sqlite as db
+        db.init_db()
+    else:
+        import db_google as db
+    return db
+
+
+# ---------------------------
+# Finding covers
+# ---------------------------
+
+def needs_cover(book: Dict[str, Any]) -> bool:
+    url = str(book.get("cover_url") or "").strip()
+    if not url or url == "None":
+        return True
+    return store().is_placeholder(cover_key(url, str(book.get("isbn") or "")))
+
+
+def candidate_urls(book: Dict[str, Any]) -> List[str]:
+    """OpenLibrary cover URLs to try, by ISBN and then by edition OLID."""
+    urls = []
+    isbn = normalize_isbn(book.get("isbn"))
+    if isbn:
+        urls.append(f"{COVER_BASE}/isbn/{isbn}-L.jpg")
+    olid = str(book.get("openlibrary_id") or "").strip().rsplit("/", 1)[-1]
+    if olid.endswith("M"):
+        urls.append(f"{COVER_BASE}/olid/{olid}-L.jpg")
+    return urls
+
+
+def cover_available(url: str) -> bool:
+    """HEAD with ?default=false: 200 means a real cover, 404 none. Raises when OpenLibrary is unhealthy."""
+    if NEGATIVE_CACHE.get(url):
+        return False
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        raise RuntimeError(f"circuit open for {url}")
+    try:
+        r = requests.head(f"{url}?default=false", timeout=8, allow_redirects=True)
+    except requests.RequestException as e:
+        breaker.record_failure(str(e))
+        raise
+    if is_failure_status(r.status_code):
+        breaker.record_failure(f"HTTP {r.status_code}")
+        raise RuntimeError(f"HTTP {r.status_code} for {url}")
+    breaker.record_success()
+    if r.status_code == 404:
+        NEGATIVE_CACHE.add(url, status=404, reason="no cover")
+    return r.ok
+
+
+def find_cover(book: Dict[str, Any]) -> str:
+    """Cache the first available candidate cover and return its URL ("" if OpenLibrary has none)."""
+    raw_isbn = str(book.get("isbn") or "")
+    for url in candidate_urls(book):
+        if not cover_available(url):
+            continue
+        key = cover_key(url, raw_isbn)
+        if store().is_placeholder(key):
+            store().discard(key)  # cached as a placeholder before; fetch it again
+        if get_local_cover(url, raw_isbn):
+            return url
+        if key not in store():
+            raise RuntimeError(f"download failed for {url}")  # not checkpointed: retried next run
+    return ""
+
+
+# ---------------------------
+# Checkpoint
+# ---------------------------
+
+class Checkpoint:
+    """{book id: cover URL found, or "" for none}, saved atomically every CHECKPOINT_EVERY results."""
+
+    def __init__(self, path: str = CHECKPOINT, restart: bool = False):
+        self.path = path
+        self.results: Dict[str, str] = {}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path) and not restart:
+            with open(path, "r", encoding="utf-8") as f:
+                self.results = json.load(f).get("results", {})
+            print(f"↩️ Resuming: {len(self.results)} book(s) already checked")
+
+    def record(self, book_id: str, url: str) -> None:
+        with self._lock:
+            self.results[book_id] = url
+            self._unsaved += 1
+            if self._unsaved >= CHECKPOINT_EVERY:
+                self._save()
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        atomic_write(self.path, json.dumps({"results": self.results}).encode("utf-8"))
+        self._unsaved = 0
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ---------------------------
+# Backfill
+# ---------------------------
+
+def backfill(backend: str = "sheets", drive: bool = False, dry_run: bool = False, restart: bool = False,
+             limit: Optional[int] = None) -> Dict[str, str]:
+    """Run (or resume) the backfill; returns {book id: new cover URL} as written back."""
+    db = _backend(backend)
+    books = {str(b["id"]): b for b in db.get_all_books() if needs_cover(b) and candidate_urls(b)}
+    checkpoint = Checkpoint(restart=restart)
+    todo = [b for book_id, b in books.items() if book_id not in checkpoint.results][:limit]
+    print(f"🔎 {len(books)} book(s) without a usable cover; {len(todo)} left to check")
+
+    def work(book: Dict[str, Any]) -> None:
+        checkpoint.record(str(book["id"]), find_cover(book))
+
+    job = scheduler.start_job("cover backfill", "openlibrary", work, todo)
+    try:
+        job.wait()
+    except KeyboardInterrupt:
+        job.cancel()
+        checkpoint.save()
+        print("⏸️ Interrupted; run again to resume")
+        raise
+    checkpoint.save()
+    summary = job.snapshot()
+    found = {book_id: url for book_id, url in checkpoint.results.items() if url and book_id in books}
+    print(f"✅ Checked {summary['done']} book(s), {summary['failed']} failed (retried next run); "
+          f"{len(found)} cover(s) found")
+
+    if drive and found:
+        isbns = {book_id: str(books[book_id].get("isbn") or "").strip() for book_id in found}
+        links = save_covers_to_drive((url, isbns[book_id]) for book_id, url in found.items())
+        found = {book_id: links.get(isbns[book_id]) or url for book_id, url in found.items()}
+        print(f"☁️ {len(links)} cover(s) in Drive")
+
+    if dry_run:
+        for book_id, url in found.items():
+            print(f"  {books[book_id].get('title', book_id)} → {url}")
+        return found
+    if found:
+        written = db.update_cover_urls(found)
+        print(f"📝 Wrote {written} cover URL(s) back in one update")
+    checkpoint.clear()
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find, cache and save missing book covers.")
+    parser.add_argument("--backend", choices=["sheets", "sqlite"], default="sheets")
+    parser.add_argument("--drive", action="store_true", help="copy found covers to the Drive covers folder")
+    parser.add_argument("--dry-run", action="store_true", help="print the URLs instead of writing them")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--limit", type=int, default=None, help="check at most this many books")
+    args = parser.parse_args()
+    backfill(args.backend, drive=args.drive, dry_run=args.dry_run, restart=args.restart, limit=args.limit)
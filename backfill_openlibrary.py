@@ -0,0 +1,103 @@
+# backfill_openlibrary.py
+# Fill in OpenLibrary ids, publishers and publication years for books that have an ISBN but lack them,
+# and write everything back to the backend in one bulk update per column.
+# Replaces archive/backfill_openlibrary_id.py (which only did ids, for books.db).
+#
+#   - ISBNs are resolved through openlibrary_async's AsyncOpenLibrary in /api/books batches of up to
+#     100, so 5,000 books cost ~50 requests (about 10 s at the default 5 req/s, rate-limited and retried);
+#     with the offline catalog (ol_dump_import.py) nothing goes to the network at all
+#   - only empty fields are filled; existing values are never overwritten
+#
+# Usage:
+#   python backfill_openlibrary.py                    # Google Sheet (what the app uses)
+#   python backfill_openlibrary.py --backend sqlite   # books.db
+#   python backfill_openlibrary.py --dry-run
+
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from ol_dates import ol_year
+from openlibrary_async import DEFAULT_RATE, AsyncOpenLibrary
+from openlibrary_local import normalize_isbn
+
+FIELDS = ("openlibrary_id", "publisher", "pub_year")
+
+
+def _backend(name: str):
+    if name == "sqlite":
+        import db_sqlite as db
+        db.init_db()
+    else:
+        import db_google as db
+    return db
+
+
+def _empty(value: Any) -> bool:
+    return str(value if value is not None else "").strip() in ("", "None", "0")
+
+
+def needs_metadata(book: Dict[str, Any]) -> bool:
+    return bool(normalize_isbn(book.get("isbn"))) and any(_empty(book.get(f)) for f in FIELDS)
+
+
+def found_fields(ed: Dict[str, Any]) -> Dict[str, Any]:
+    """Backend columns from an edition record: the work's OLID (as the app stores it), else the edition's."""
+    works = ed.get("works") or []
+    key = ((works[0] or {}).get("key") if works else None) or ed.get("key") or ""
+    publishers = ed.get("publishers") or []
+    return {
+        "openlibrary_id": key.rsplit("/", 1)[-1],
+        "publisher": ", ".join(p.get("name", "") if isinstance(p, dict) else str(p) for p in publishers),
+        "pub_year": ol_year(ed.get("publish_date")),
+    }
+
+
+async def _editions(isbns: List[str], rate: float) -> Dict[str, Dict[str, Any]]:
+    async with AsyncOpenLibrary(rate=rate) as ol:
+        editions = await ol.editions_by_isbn(isbns)
+        print(f"🌐 {ol.stats['requests']} request(s), {ol.stats['local']} answered locally, "
+              f"{ol.stats['failures']} failed")
+    return editions
+
+
+def backfill(backend: str = "sheets", dry_run: bool = False, limit: Optional[int] = None,
+             rate: float = DEFAULT_RATE) -> Dict[str, Dict[str, Any]]:
+    """Run the backfill; returns {column: {book id: value}} as written back."""
+    db = _backend(backend)
+    books = [b for b in db.get_all_books() if needs_metadata(b)][:limit]
+    print(f"🔎 {len(books)} book(s) with an ISBN but missing {' / '.join(FIELDS)}")
+    started = time.time()
+    editions = asyncio.run(_editions([b["isbn"] for b in books], rate))
+    print(f"📚 OpenLibrary knows {len(editions)} of them ({time.time() - started:.1f}s)")
+
+    updates: Dict[str, Dict[str, Any]] = {f: {} for f in FIELDS}
+    for b in books:
+        ed = editions.get(normalize_isbn(b.get("isbn")))
+        if not ed:
+            continue
+        for column, value in found_fields(ed).items():
+            if value and _empty(b.get(column)):
+                updates[column][b["id"]] = value
+    updates = {column: values for column, values in updates.items() if values}
+
+    if dry_run:
+        for column, values in updates.items():
+            print(f"  {column}: {len(values)} book(s)")
+        return updates
+    if updates:
+        written = db.update_columns(updates)
+        print(f"📝 Wrote {written} value(s) back in {len(updates)} column update(s)")
+    return updates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill missing OpenLibrary ids, publishers and years by ISBN.")
+    parser.add_argument("--backend", choices=["sheets", "sqlite"], default="sheets")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be written")
+    parser.add_argument("--limit", type=int, default=None, help="look up at most this many books")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="max OpenLibrary requests per second")
+    args = parser.parse_args()
+    backfill(args.backend, dry_run=args.dry_run, limit=args.limit, rate=args.rate)
@@ -0,0 +1,179 @@
+# cover_batch.py
+# Bulk, CPU-bound cover work on a process pool, so it scales with cores instead of being held to one
+# by the GIL:
+#   rebuild — re-detect placeholders and rebuild every size variant (WebP/JPEG), inline preview and
+#             perceptual hash of each cached original
+#   dedupe  — group near-identical covers (dHash within a Hamming distance) and, with --apply, point
+#             all their keys at the largest image and delete the rest
+#
+# Workers get chunks of file paths (never image bytes) and write variants next to the originals;
+# the parent applies their small result dicts to the store index (and pack) as chunks finish.
+# Run while the app is stopped, or at least while nothing else is writing the cache.
+#
+#   python cover_batch.py rebuild [--workers 8] [--chunk 64]
+#   python cover_batch.py dedupe [--distance 4] [--apply]
+
+from __future__ import annotations
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+from cover_cache import CoverStore, inspect_image, make_preview, make_variants
+
+CHUNK = 64        # originals per work unit: big enough to amortize IPC, small enough to spread load
+DISTANCE = 4      # max differing dHash bits for two covers to count as the same image
+
+
+def dhash(im: Image.Image) -> str:
+    """64-bit difference hash as 16 hex digits; survives resizing and recompression."""
+    small = ImageOps.exif_transpose(im).convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+# ---------------------------
+# Worker side (runs in child processes)
+# ---------------------------
+
+def _process_chunk(paths: List[str], variants: bool) -> List[Dict[str, Any]]:
+    """Inspect (and optionally rebuild variants of) each original; returns one small dict per path."""
+    out = []
+    for path in paths:
+        result: Dict[str, Any] = {"digest": os.path.splitext(os.path.basename(path))[0]}
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            _, _, placeholder = inspect_image(data)
+            result["placeholder"] = placeholder
+            if not placeholder:
+                with Image.open(path) as im:
+                    result["dhash"] = dhash(im)
+                result["preview"] = make_preview(data)
+                if variants:
+                    result["variants"], result["saved"] = make_variants(path)
+        except Exception as e:
+            result["error"] = str(e)
+        out.append(result)
+    return out
+
+
+def _run(paths: List[str], variants: bool, workers: Optional[int], chunk: int):
+    """Yield result dicts as chunks complete."""
+    chunks = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_process_chunk, c, variants) for c in chunks]
+        for fut in as_completed(futures):
+            yield from fut.result()
+
+
+# ---------------------------
+# Commands (parent process)
+# ---------------------------
+
+def rebuild(store: CoverStore, workers: Optional[int] = None, chunk: int = CHUNK,
+            variants: bool = True) -> Dict[str, int]:
+    """Placeholders, previews, dHashes (and, by default, size variants) for every cached original."""
+    digests = [d for d in store.blob_widths() if os.path.exists(store.blob_path(d))]
+    started = time.time()
+    stats = {"covers": 0, "placeholders": 0, "errors": 0, "saved_bytes": 0}
+    for r in _run([store.blob_path(d) for d in digests], variants, workers, chunk):
+        if "error" in r:
+            stats["errors"] += 1
+            print(f"⚠️ Could not process {r['digest']}: {r['error']}")
+            continue
+        store.set_image_facts(r["digest"], r["placeholder"], r.get("preview", ""), r.get("dhash"))
+        if "variants" in r:
+            store.replace_variants(r["digest"], r["variants"], r["saved"])
+            stats["saved_bytes"] += r["saved"]
+        stats["covers"] += 1
+        stats["placeholders"] += r["placeholder"]
+        if stats["covers"] % 500 == 0:
+            print(f"… {stats['covers']}/{len(digests)} covers")
+    print(f"🖼️ Processed {stats['covers']} cover(s) in {time.time() - started:.1f}s "
+          f"({stats['placeholders']} placeholders, {stats['errors']} errors)")
+    return stats
+
+
+def near_duplicates(store: CoverStore, distance: int = DISTANCE, workers: Optional[int] = None,
+                    chunk: int = CHUNK) -> List[List[Dict[str, Any]]]:
+    """Groups (largest image first) of covers whose dHashes differ in at most `distance` bits."""
+    facts = [f for f in store.blob_facts() if not f["placeholder"]]
+    missing = [f["hash"] for f in facts if not f["dhash"] and os.path.exists(store.blob_path(f["hash"]))]
+    if missing:
+        for r in _run([store.blob_path(d) for d in missing], False, workers, chunk):
+            if "error" not in r:
+                store.set_image_facts(r["digest"], r["placeholder"], r.get("preview", ""), r.get("dhash"))
+        facts = [f for f in store.blob_facts() if not f["placeholder"]]
+    facts = [f for f in facts if f["dhash"]]
+
+    # Pigeonhole: hashes within `distance` bits agree exactly on at least one of distance+1 bands,
+    # so only covers sharing a band are compared (instead of every pair)
+    bands = distance + 1
+    width = -(-64 // bands)
+    buckets: Dict[tuple, List[int]] = {}
+    values = [int(f["dhash"], 16) for f in facts]
+    for i, v in enumerate(values):
+        for b in range(bands):
+            buckets.setdefault((b, (v >> (b * width)) & ((1 << width) - 1)), []).append(i)
+
+    # Largest first: each still-ungrouped cover starts a group and takes in every ungrouped cover within
+    # `distance` of *it* (the image that is kept), never transitively through another member
+    order = sorted(range(len(facts)), key=lambda i: (facts[i]["width"] or 0) * (facts[i]["height"] or 0),
+                   reverse=True)
+    group_of: Dict[int, int] = {}
+    groups: Dict[int, List[Dict[str, Any]]] = {}
+    for i in order:
+        if i in group_of:
+            continue
+        group_of[i] = i
+        groups[i] = [facts[i]]
+        for b in range(bands):
+            for j in buckets[(b, (values[i] >> (b * width)) & ((1 << width) - 1))]:
+                if j not in group_of and bin(values[i] ^ values[j]).count("1") <= distance:
+                    group_of[j] = i
+                    groups[i].append(facts[j])
+    # The representative stays first even if a member ties it on size
+    return [
+        g[:1] + sorted(g[1:], key=lambda f: (f["width"] or 0) * (f["height"] or 0), reverse=True)
+        for g in groups.values() if len(g) > 1
+    ]
+
+
+def dedupe(store: CoverStore, distance: int = DISTANCE, apply: bool = False, workers: Optional[int] = None,
+           chunk: int = CHUNK) -> int:
+    """Report near-duplicate covers; with apply=True keep the largest of each group. Returns blobs dropped."""
+    groups = near_duplicates(store, distance, workers, chunk)
+    dropped = 0
+    for group in groups:
+        keep, rest = group[0], group[1:]
+        print(f"🔁 {keep['hash'][:12]} ({keep['width']}×{keep['height']}) ≈ "
+              + ", ".join(f"{f['hash'][:12]} ({f['width']}×{f['height']})" for f in rest))
+        if apply:
+            store.merge_blobs(keep["hash"], [f["hash"] for f in rest])
+            dropped += len(rest)
+    print(f"{'🧹 Merged' if apply else 'Found'} {sum(len(g) - 1 for g in groups)} duplicate cover(s) "
+          f"in {len(groups)} group(s)")
+    return dropped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk cover processing on all cores.")
+    parser.add_argument("command", choices=["rebuild", "dedupe"])
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="originals per work unit")
+    parser.add_argument("--distance", type=int, default=DISTANCE, help="dedupe: max differing hash bits")
+    parser.add_argument("--apply", action="store_true", help="dedupe: merge duplicates instead of listing them")
+    args = parser.parse_args()
+    cover_store = CoverStore()
+    if args.command == "rebuild":
+        rebuild(cover_store, workers=args.workers, chunk=args.chunk)
+    else:
+        dedupe(cover_store, distance=args.distance, apply=args.apply, workers=args.workers, chunk=args.chunk)
@@ -0,0 +1,720 @@
+# cover_cache.py
+# Local cover store:
+#   - size variants: the library list shows covers at 60px and the detail view at 180px, so each
+#     cached original gets a small thumbnail per display size (stored at 2× for high-DPI screens) and
+#     callers are handed the smallest variant that is big enough. Thumbnails are WebP unless the
+#     JPEG encoding comes out smaller (or Pillow lacks WebP / COVER_WEBP=0); bytes saved are tracked
+#   - content-addressed blobs (covers_cache/blobs/ab/<sha256>.jpg) with an SQLite index mapping
+#     cover keys (normalized ISBN, or a hash of the cover URL) to blobs, so identical images are
+#     stored once; least-recently-used blobs are evicted to stay under a byte budget
+#   - the index is held in memory (loaded once, updated on writes), so resolving a cover during a
+#     render is a dict lookup: no SQLite query and no exists/getsize calls
+#   - optionally (COVER_PACK=1) thumbnails live in one mmap'd pack file instead of per-file (cover_pack)
+#   - static serving: covers can be published under static/covers/ (hard links, named by content
+#     hash) and shown via Streamlit's static route, so browsers cache them instead of re-streaming
+#   - every file is written to a temp name and renamed into place, so readers never see a partial
+#     image; key_lock() makes concurrent fetches of one cover (threads, sessions, or a backfill in
+#     another process) run one at a time, and the later ones find it cached
+#   - per-cover validators (ETag / Last-Modified) and image facts (dimensions, placeholder flag) for
+#     conditional revalidation (covers_google.revalidate_covers)
+#   - a tiny inline preview per cover (8×12 JPEG data URI, a few hundred bytes) that is stored with
+#     the book and painted immediately while the real thumbnail loads
+
+from __future__ import annotations
+import glob
+import base64
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import fcntl  # cross-process key locks; on platforms without it they are in-process only
+except ImportError:
+    fcntl = None
+
+from PIL import Image, ImageOps, features
+
+import cover_pack
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "covers_cache")
+MAX_BYTES = int(float(os.environ.get("COVER_CACHE_MAX_MB", "200")) * 1024 * 1024)
+# Served by Streamlit at app/static/... when server.enableStaticServing is on (.streamlit/config.toml)
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static", "covers")
+STATIC_URL = "app/static/covers"
+SYNC_INTERVAL = 5.0  # seconds between flushing access times / checking for other writers
+LOCK_STRIPES = 4096  # byte-range locks in covers_cache/keys.lock; keys hash onto them
+
+# display name -> CSS width in px
+VARIANTS: Dict[str, int] = {"list": 60, "detail": 180}
+SCALE = 2
+JPEG_QUALITY = 82
+# WebP at this quality looks like the JPEG thumbnails at 82 for roughly 25-35% fewer bytes
+WEBP_QUALITY = 75
+WEBP = os.environ.get("COVER_WEBP", "1") != "0" and features.check("webp")
+# OpenLibrary answers a missing cover with a 1×1 image; anything this small is not a real cover
+PLACEHOLDER_MAX_PX = 10
+PLACEHOLDER_MAX_BYTES = 500
+PREVIEW_SIZE = (8, 12)
+PREVIEW_QUALITY = 40
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write to a temp file next to path, then rename over it: readers see the old file or the new one."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def variant_path(original: str, width: int, ext: str = "jpg") -> str:
+    """covers_cache/9780451169532.jpg -> covers_cache/9780451169532_w120.webp (ext="webp")"""
+    stem, _ = os.path.splitext(original)
+    return f"{stem}_w{width}.{ext}"
+
+
+def encode_thumbnail(thumb: Image.Image) -> Tuple[bytes, str, int]:
+    """(data, ext, bytes saved over JPEG): WebP when available and smaller, else JPEG."""
+    out = io.BytesIO()
+    thumb.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    jpeg = out.getvalue()
+    if WEBP:
+        out = io.BytesIO()
+        thumb.save(out, "WEBP", quality=WEBP_QUALITY, method=6)
+        webp = out.getvalue()
+        if len(webp) < len(jpeg):
+            return webp, "webp", len(jpeg) - len(webp)
+    return jpeg, "jpg", 0
+
+
+def make_variant(original: str, width: int) -> Tuple[Optional[str], int]:
+    """
+    Write a `width`-px wide thumbnail of original (never upscaled, see encode_thumbnail);
+    returns (its path or None, bytes saved over JPEG).
+    """
+    try:
+        with Image.open(original) as im:
+            im = ImageOps.exif_transpose(im)
+            if im.width <= width:
+                return None, 0  # original is already small enough; serve it as-is
+            height = max(1, round(im.height * width / im.width))
+            thumb = im.convert("RGB").resize((width, height), Image.Resampling.LANCZOS)
+        data, ext, saved = encode_thumbnail(thumb)
+        out = variant_path(original, width, ext)
+        atomic_write(out, data)
+        return out, saved
+    except Exception as e:
+        print(f"⚠️ Could not build {width}px variant of {original}: {e}")
+        return None, 0
+
+
+def inspect_image(data: bytes) -> Tuple[int, int, bool]:
+    """(width, height, is_placeholder); undecodable data counts as a placeholder."""
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            width, height = im.size
+            im.verify()
+    except Exception:
+        return 0, 0, True
+    tiny = width <= PLACEHOLDER_MAX_PX or height <= PLACEHOLDER_MAX_PX
+    return width, height, tiny or len(data) <= PLACEHOLDER_MAX_BYTES
+
+
+def make_preview(data: bytes) -> str:
+    """8×12 JPEG of the cover as a data URI (a few hundred bytes), or "" if undecodable."""
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            tiny = ImageOps.fit(ImageOps.exif_transpose(im).convert("RGB"), PREVIEW_SIZE, Image.Resampling.BOX)
+        out = io.BytesIO()
+        tiny.save(out, "JPEG", quality=PREVIEW_QUALITY, optimize=True)
+    except Exception as e:
+        print(f"⚠️ Could not build cover preview: {e}")
+        return ""
+    return "data:image/jpeg;base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def make_variants(original: str) -> Tuple[Dict[str, str], int]:
+    """Build every display variant of a freshly cached original; ({name: path}, bytes saved over JPEG)."""
+    out, saved = {}, 0
+    for name, css_width in VARIANTS.items():
+        path, variant_saved = make_variant(original, css_width * SCALE)
+        if path:
+            out[name] = path
+            saved += variant_saved
+    return out, saved
+
+
+def _format_widths(widths: Dict[int, str]) -> str:
+    return ",".join(f"{w}:{ext}" for w, ext in sorted(widths.items()))
+
+
+def parse_widths(widths: str) -> Dict[int, str]:
+    """Index column "120:webp,360:jpg" -> {120: "webp", 360: "jpg"} (bare widths are JPEG)."""
+    out = {}
+    for entry in filter(None, widths.split(",")):
+        width, _, ext = entry.partition(":")
+        out[int(width)] = ext or "jpg"
+    return out
+
+
+def compose_sprite(
+    images: List[Union[str, bytes, memoryview, None]], size: str = "list", columns: int = 10, gap: int = 8,
+) -> bytes:
+    """
+    One JPEG grid of thumbnails (paths or image bytes; None → empty tile), each padded to a 2:3 tile
+    of the size's 2× width. Lets a whole library month render as a single image.
+    """
+    tile_w = VARIANTS[size] * SCALE
+    tile_h = tile_w * 3 // 2
+    columns = max(1, min(columns, len(images)))
+    rows = (len(images) + columns - 1) // columns
+    sheet = Image.new("RGB", (columns * tile_w + (columns - 1) * gap, rows * tile_h + (rows - 1) * gap), "white")
+    for i, src in enumerate(images):
+        x, y = (i % columns) * (tile_w + gap), (i // columns) * (tile_h + gap)
+        tile = Image.new("RGB", (tile_w, tile_h), (238, 238, 238))
+        if src is not None:
+            try:
+                with Image.open(io.BytesIO(src) if not isinstance(src, str) else src) as im:
+                    tile = ImageOps.pad(im.convert("RGB"), (tile_w, tile_h), color=(255, 255, 255))
+            except Exception as e:
+                print(f"⚠️ Skipping unreadable cover in sprite: {e}")
+        sheet.paste(tile, (x, y))
+    out = io.BytesIO()
+    sheet.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+# ---------------------------
+# Content-addressed store
+# ---------------------------
+
+_NON_ISBN = re.compile(r"[^0-9Xx]")
+
+def cover_key(url: str = "", isbn: str = "") -> str:
+    """Normalized ISBN if there is one, else a stable hash of the cover URL without its query string."""
+    clean_isbn = _NON_ISBN.sub("", str(isbn or "")).upper()
+    if clean_isbn:
+        return clean_isbn
+    url = str(url or "").strip()
+    if not url:
+        return ""
+    # Drop transient params (sz=, export=, ...)
+    parsed = urllib.parse.urlparse(url)
+    base_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+    return hashlib.sha1(base_url.encode()).hexdigest()[:12]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    widths TEXT NOT NULL DEFAULT '',
+    width INTEGER,
+    height INTEGER,
+    placeholder INTEGER NOT NULL DEFAULT 0,
+    preview TEXT,
+    saved INTEGER NOT NULL DEFAULT 0,
+    dhash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_blobs_access ON blobs(last_access);
+CREATE TABLE IF NOT EXISTS covers (
+    key TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    checked REAL
+);
+CREATE INDEX IF NOT EXISTS idx_covers_hash ON covers(hash);
+"""
+
+# Columns added after an index.db may already exist; created on open when missing
+ADDED_COLUMNS = [
+    ("blobs", "widths", "TEXT NOT NULL DEFAULT ''"),
+    ("blobs", "width", "INTEGER"),
+    ("blobs", "height", "INTEGER"),
+    ("blobs", "placeholder", "INTEGER NOT NULL DEFAULT 0"),
+    ("blobs", "preview", "TEXT"),
+    ("blobs", "saved", "INTEGER NOT NULL DEFAULT 0"),
+    ("blobs", "dhash", "TEXT"),
+    ("covers", "etag", "TEXT"),
+    ("covers", "last_modified", "TEXT"),
+    ("covers", "checked", "REAL"),
+]
+
+
+class CoverStore:
+    """Thread-safe; several processes (app + backfill) can share one directory (SQLite WAL)."""
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = MAX_BYTES, pack: Optional[bool] = None,
+                 static_dir: str = STATIC_DIR):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.static_dir = static_dir
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        for table, column, decl in ADDED_COLUMNS:
+            if column not in {row[1] for row in self._db.execute(f"PRAGMA table_info({table})")}:
+                self._db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        self._lock = threading.Lock()
+        self._keys: Dict[str, str] = {}                     # cover key -> blob hash
+        self._widths: Dict[str, Dict[int, str]] = {}        # blob hash -> {variant width: file extension}
+        self._placeholders: set = set()                     # blob hashes that are not real covers
+        self._previews: Dict[str, str] = {}                 # blob hash -> inline preview data URI
+        self._touched: Dict[str, float] = {}                # access times not yet written back
+        self._published = set(os.listdir(static_dir)) if os.path.isdir(static_dir) else set()
+        self._version = None
+        self._synced = 0.0
+        self._key_locks: Dict[str, threading.Lock] = {}      # one per cover key ever fetched (small)
+        self._stripe_locks: Dict[int, threading.Lock] = {}   # one per keys.lock byte range in use
+        self._lock_file = open(os.path.join(root, "keys.lock"), "a+b") if fcntl else None
+        if pack is None:
+            # Once thumbnails were migrated into a pack, keep reading them from it
+            pack_file = os.path.join(root, "thumbs.pack")
+            pack = cover_pack.ENABLED or (os.path.exists(pack_file) and os.path.getsize(pack_file) > 0)
+        self.pack = cover_pack.PackStore(root) if pack else None
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "deduped": 0, "evictions": 0, "evicted_bytes": 0,
+                      "placeholder_hits": 0}
+        self._load()
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.jpg")
+
+    # ---------------------------
+    # In-memory index
+    # ---------------------------
+
+    def _load(self) -> None:
+        with self._lock:
+            self._keys = dict(self._db.execute("SELECT key, hash FROM covers"))
+            self._widths = {
+                digest: parse_widths(widths) for digest, widths in self._db.execute("SELECT hash, widths FROM blobs")
+            }
+            self._placeholders = {row[0] for row in self._db.execute("SELECT hash FROM blobs WHERE placeholder = 1")}
+            self._previews = dict(self._db.execute("SELECT hash, preview FROM blobs WHERE COALESCE(preview, '') != ''"))
+            self._version = self._db.execute("PRAGMA data_version").fetchone()[0]
+            self._synced = time.monotonic()
+
+    def _maybe_sync(self, force: bool = False) -> None:
+        """Every SYNC_INTERVAL: write back access times, and reload if another process changed the index."""
+        if not force and time.monotonic() - self._synced < SYNC_INTERVAL:
+            return
+        with self._lock:
+            self._synced = time.monotonic()
+            touched, self._touched = self._touched, {}
+            if touched:
+                self._db.executemany(
+                    "UPDATE blobs SET last_access = ? WHERE hash = ?", [(t, h) for h, t in touched.items()]
+                )
+                self._db.commit()
+            # data_version only changes for commits made by *other* connections
+            changed = self._db.execute("PRAGMA data_version").fetchone()[0] != self._version
+        if changed:
+            self._load()
+            if self.pack is not None:
+                self.pack.reload()  # thumbnails the other process appended
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    @contextmanager
+    def key_lock(self, key: str) -> Iterator[None]:
+        """
+        Exclusive section for fetching/storing one cover: a per-key lock within this process plus
+        (where fcntl exists) a byte-range lock on covers_cache/keys.lock shared with other processes.
+        On entry the in-memory index is refreshed, so `key in store` reflects what others stored.
+        """
+        stripe = zlib.crc32(key.encode()) % LOCK_STRIPES
+        with self._lock:
+            lock = self._key_locks.setdefault(key, threading.Lock())
+            # lockf locks belong to the process, so keys sharing a stripe also share it between threads:
+            # otherwise the first thread to unlock would drop the other's cross-process exclusion
+            stripe_lock = self._stripe_locks.setdefault(stripe, threading.Lock())
+        with lock, stripe_lock:
+            if self._lock_file is not None:
+                fcntl.lockf(self._lock_file, fcntl.LOCK_EX, 1, stripe)
+            try:
+                self._maybe_sync(force=True)
+                yield
+            finally:
+                if self._lock_file is not None:
+                    fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, stripe)
+
+    def resolve(self, key: str, size: Optional[str] = None) -> Optional[str]:
+        """
+        Path for key at a display size (see VARIANTS; None = original), or None if not cached
+        or cached as a placeholder (`key in store` is still True then, so it isn't refetched).
+        Answered from memory; marks the blob recently used.
+        """
+        self._maybe_sync()
+        digest = self._keys.get(key) if key else None
+        if digest is None:
+            self.stats["misses"] += 1
+            return None
+        if digest in self._placeholders:
+            self.stats["placeholder_hits"] += 1
+            return None
+        self.stats["hits"] += 1
+        self._touched[digest] = time.time()
+        path = self.blob_path(digest)
+        width = VARIANTS.get(size or "", 0) * SCALE
+        ext = self._widths.get(digest, {}).get(width)
+        if ext:
+            return variant_path(path, width, ext)
+        return path  # no variant: the original is already small enough
+
+    def digest(self, key: str) -> Optional[str]:
+        """Content hash served for key (None if missing or a placeholder); changes whenever the cover does."""
+        digest = self._keys.get(key) if key else None
+        return None if digest in self._placeholders else digest
+
+    def static_url(self, key: str, size: Optional[str] = None) -> Optional[str]:
+        """
+        Browser URL for key's cover via Streamlit static serving, publishing the file on first use.
+        The name carries the content hash and ?v= makes Tornado send a far-future Cache-Control, so
+        a browser fetches each cover once; a changed cover gets a new URL.
+        """
+        path = self.resolve(key, size)
+        if not path:
+            return None
+        name = os.path.basename(path)
+        if name not in self._published:
+            dst = os.path.join(self.static_dir, name)
+            os.makedirs(self.static_dir, exist_ok=True)
+            try:
+                os.link(path, dst)  # same bytes, no copy
+            except FileExistsError:
+                pass
+            except OSError:
+                # Other filesystem, or the thumbnail only exists inside the pack
+                data = self.image(key, size)
+                try:
+                    if isinstance(data, str):
+                        with open(data, "rb") as f:
+                            data = f.read()
+                except OSError:
+                    data = None
+                if data is None:
+                    return None  # evicted since resolve()
+                atomic_write(dst, data)
+            self._published.add(name)
+        # Blob (and variant) file names start with the content hash; the key itself may be evicted by now
+        return f"{STATIC_URL}/{name}?v={name[:12]}"
+
+    def preview(self, key: str) -> str:
+        """
+        Inline preview data URI for key's cover ("" if not cached or a placeholder). Blobs cached
+        before previews existed get theirs built from the original on first request.
+        """
+        digest = self.digest(key)
+        if digest is None:
+            return ""
+        preview = self._previews.get(digest)
+        if preview is None:
+            try:
+                with open(self.blob_path(digest), "rb") as f:
+                    preview = make_preview(f.read())
+            except OSError:
+                return ""
+            with self._lock:
+                self._db.execute("UPDATE blobs SET preview = ? WHERE hash = ?", (preview, digest))
+                self._db.commit()
+                self._previews[digest] = preview
+        return preview
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the original image stored under key (and mark it recently used), or None."""
+        return self.resolve(key)
+
+    def image(self, key: str, size: Optional[str] = None) -> Union[str, memoryview, None]:
+        """Like resolve(), but a packed thumbnail comes back as a zero-copy slice of the pack."""
+        path = self.resolve(key, size)
+        if path and self.pack is not None:
+            packed = self.pack.get(os.path.basename(path))
+            if packed is not None:
+                return packed
+        return path
+
+    def put(self, key: str, data: bytes, url: str = "", etag: str = "", last_modified: str = "") -> str:
+        """
+        Store data under key (deduplicated by content) and build its size variants; returns the blob
+        path. Placeholder/undecodable images are recorded (so they aren't refetched) but never served.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        now = time.time()
+        with self._lock:
+            exists = self._db.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if exists and os.path.exists(path):
+            with self._lock:
+                self.stats["deduped"] += 1
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, data)
+            width, height, placeholder = inspect_image(data)
+            variants, saved = ({}, 0) if placeholder else make_variants(path)
+            preview = "" if placeholder else make_preview(data)
+            widths, variant_bytes = self._store_variants(variants)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO blobs (hash, bytes, created, last_access, widths, width, height, placeholder,"
+                    " preview, saved) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (digest, len(data) + variant_bytes, now, now, _format_widths(widths),
+                     width, height, int(placeholder), preview, saved),
+                )
+                self._widths[digest] = widths
+                self._previews[digest] = preview
+                if placeholder:
+                    self._placeholders.add(digest)
+                self.stats["writes"] += 1
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO covers (key, hash, url, etag, last_modified, checked) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, url, etag or None, last_modified or None, now),
+            )
+            self._db.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (now, digest))
+            self._db.commit()
+            self._keys[key] = digest
+        self.evict()
+        return path
+
+    def _store_variants(self, variants: Dict[str, str]) -> Tuple[Dict[int, str], int]:
+        """({width: ext}, bytes) of freshly built variant files, moving them into the pack if there is one."""
+        widths = {VARIANTS[name] * SCALE: os.path.splitext(p)[1][1:] for name, p in variants.items()}
+        size = sum(os.path.getsize(p) for p in variants.values())
+        if self.pack is not None:
+            for vpath in variants.values():
+                with open(vpath, "rb") as f:
+                    self.pack.put(os.path.basename(vpath), f.read())
+                os.remove(vpath)
+        return widths, size
+
+    def replace_variants(self, digest: str, variants: Dict[str, str], saved: int) -> None:
+        """Record freshly built variant files of a blob (from make_variants) and drop its old ones."""
+        path = self.blob_path(digest)
+        old = {os.path.basename(variant_path(path, w, e)) for w, e in self._widths.get(digest, {}).items()}
+        widths, variant_bytes = self._store_variants(variants)
+        with self._lock:
+            self._db.execute(
+                "UPDATE blobs SET bytes = ?, widths = ?, saved = ? WHERE hash = ?",
+                (os.path.getsize(path) + variant_bytes, _format_widths(widths), saved, digest),
+            )
+            self._db.commit()
+            self._widths[digest] = widths
+        stale = old - {os.path.basename(variant_path(path, w, e)) for w, e in widths.items()}
+        for name in stale:
+            try:
+                os.remove(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                pass
+        if self.pack is not None and stale:
+            self.pack.delete(stale)
+
+    def set_image_facts(self, digest: str, placeholder: bool, preview: str, dhash: str) -> None:
+        """Store what a bulk pass (cover_batch) found out about a blob."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE blobs SET placeholder = ?, preview = ?, dhash = ? WHERE hash = ?",
+                (int(placeholder), preview, dhash, digest),
+            )
+            self._db.commit()
+            self._previews[digest] = preview
+            if placeholder:
+                self._placeholders.add(digest)
+            else:
+                self._placeholders.discard(digest)
+
+    def blob_widths(self) -> Dict[str, Dict[int, str]]:
+        """{blob hash: {variant width: file extension}} for every cached blob (a copy)."""
+        with self._lock:
+            return {digest: dict(widths) for digest, widths in self._widths.items()}
+
+    def blob_facts(self) -> List[Dict[str, Any]]:
+        """hash, width, height, placeholder and dhash of every blob."""
+        with self._lock:
+            rows = self._db.execute("SELECT hash, width, height, placeholder, dhash FROM blobs").fetchall()
+        return [dict(zip(("hash", "width", "height", "placeholder", "dhash"), r)) for r in rows]
+
+    def merge_blobs(self, keep: str, drop: Iterable[str]) -> int:
+        """Point every key using a blob in drop at keep instead, then delete those blobs; returns keys moved."""
+        gone = set(drop) - {keep}
+        if not gone:
+            return 0
+        with self._lock:
+            moved = 0
+            for digest in gone:
+                moved += self._db.execute("UPDATE covers SET hash = ? WHERE hash = ?", (keep, digest)).rowcount
+                self._db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                self._forget(digest)
+            self._db.commit()
+            self._keys = {k: keep if h in gone else h for k, h in self._keys.items()}
+        self._remove_blob_files(gone)
+        return moved
+
+    def _forget(self, digest: str) -> None:
+        self._widths.pop(digest, None)
+        self._placeholders.discard(digest)
+        self._previews.pop(digest, None)
+
+    def _remove_blob_files(self, gone: set) -> None:
+        """Delete the files, pack entries and published copies of blobs already gone from the index."""
+        for digest in gone:
+            for p in self._blob_files(digest):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+        if self.pack is not None and gone:
+            self.pack.delete(
+                os.path.basename(variant_path(self.blob_path(d), css * SCALE, ext))
+                for d in gone for css in VARIANTS.values() for ext in ("jpg", "webp")
+            )
+        for name in [n for n in self._published if n[:64] in gone]:
+            try:
+                os.remove(os.path.join(self.static_dir, name))
+            except OSError:
+                pass
+            self._published.discard(name)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM covers WHERE key = ?", (key,))
+            self._db.commit()
+            self._keys.pop(key, None)
+
+    def is_placeholder(self, key: str) -> bool:
+        return self._keys.get(key) in self._placeholders
+
+    # ---------------------------
+    # Revalidation bookkeeping
+    # ---------------------------
+
+    def due_for_revalidation(self, max_age: float, limit: int = 500) -> List[Dict[str, Any]]:
+        """Covers with a source URL not checked for max_age seconds; placeholders first, then oldest."""
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT c.key, c.url, c.hash, c.etag, c.last_modified, b.placeholder
+                FROM covers c JOIN blobs b ON b.hash = c.hash
+                WHERE COALESCE(c.url, '') != '' AND COALESCE(c.checked, 0) < ?
+                ORDER BY b.placeholder DESC, COALESCE(c.checked, 0)
+                LIMIT ?
+                """,
+                (time.time() - max_age, limit),
+            ).fetchall()
+        cols = ("key", "url", "hash", "etag", "last_modified", "placeholder")
+        return [dict(zip(cols, r)) for r in rows]
+
+    def mark_checked(self, key: str, etag: str = "", last_modified: str = "") -> None:
+        """Record a revalidation that found the cover unchanged (keeping old validators unless new ones came)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE covers SET checked = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)"
+                " WHERE key = ?",
+                (time.time(), etag or None, last_modified or None, key),
+            )
+            self._db.commit()
+
+    def _blob_files(self, digest: str):
+        original = self.blob_path(digest)
+        return [original] + glob.glob(f"{os.path.splitext(original)[0]}_w*.*")
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least-recently-used blobs (and every key pointing at them) until under budget."""
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        gone = set()
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM blobs").fetchone()[0]
+            if total <= budget:
+                return 0
+            # Recent reads are only in memory until the next sync; LRU order needs them now
+            touched, self._touched = self._touched, {}
+            self._db.executemany(
+                "UPDATE blobs SET last_access = ? WHERE hash = ?", [(t, h) for h, t in touched.items()]
+            )
+            for digest, size in self._db.execute(
+                "SELECT hash, bytes FROM blobs ORDER BY last_access"
+            ).fetchall():
+                if total <= budget:
+                    break
+                self._db.execute("DELETE FROM covers WHERE hash = ?", (digest,))
+                self._db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                self._forget(digest)
+                gone.add(digest)
+                total -= size
+                self.stats["evictions"] += 1
+                self.stats["evicted_bytes"] += size
+            self._db.commit()
+            self._keys = {k: h for k, h in self._keys.items() if h not in gone}
+        self._remove_blob_files(gone)
+        evicted = len(gone)
+        if evicted:
+            print(f"🧹 Evicted {evicted} cover(s) to stay under {budget // (1024 * 1024)} MB")
+        return evicted
+
+    def import_legacy(self) -> int:
+        """Move pre-store covers_cache/{isbn-or-urlhash}.jpg files into the store (their names are keys)."""
+        moved = 0
+        for path in glob.glob(os.path.join(self.root, "*.jpg")):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if "_w" in name:
+                os.remove(path)  # old size variant; rebuilt from the blob
+                continue
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                if data:
+                    key = name if re.fullmatch(r"[0-9a-f]{12}", name) else cover_key(isbn=name)
+                    self.put(key, data)
+                    moved += 1
+                os.remove(path)
+            except OSError as e:
+                print(f"⚠️ Could not import {path}: {e}")
+        if moved:
+            print(f"📦 Imported {moved} legacy cover(s) into the content-addressed store")
+        return moved
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            blobs, total, saved = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0), COALESCE(SUM(saved), 0) FROM blobs"
+            ).fetchone()
+            keys = self._db.execute("SELECT COUNT(*) FROM covers").fetchone()[0]
+            webp = sum(1 for widths in self._widths.values() for ext in widths.values() if ext == "webp")
+            return {
+                "keys": keys, "blobs": blobs, "bytes": total, "max_bytes": self.max_bytes,
+                "webp_variants": webp, "webp_saved_bytes": saved,
+                "placeholders": len(self._placeholders), **self.stats,
+                **({"pack": self.pack.snapshot()} if self.pack is not None else {}),
+            }
+
+
+_STORE: Optional[CoverStore] = None
+_STORE_LOCK = threading.Lock()
+
+def store() -> CoverStore:
+    """Process-wide CoverStore over CACHE_DIR (legacy flat files are imported on first use)."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = CoverStore()
+            _STORE.import_legacy()
+        return _STORE
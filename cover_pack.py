@@ -0,0 +1,178 @@
+# cover_pack.py
+# Optional packed thumbnail store (COVER_PACK=1): every list/detail thumbnail lives in one
+# append-only blob file (covers_cache/thumbs.pack) instead of thousands of small files.
+#
+#   thumbs.pack  — thumbnails back to back
+#   thumbs.idx   — append-only log of "name offset length" lines; the last line for a name wins,
+#                  length 0 is a deletion. Replayed into a dict on open.
+#
+# Reads go through mmap, so a thumbnail is a memoryview slice (no per-file open, no copy).
+# Deleted/replaced entries leave garbage behind until compact() rewrites both files.
+# Appends are safe across processes (O_APPEND; offsets are taken after the write); run
+# migrate/compact while the app is stopped.
+#
+#   python cover_pack.py migrate   # move existing per-file thumbnails into the pack
+#   python cover_pack.py compact   # reclaim space left by evictions (never done by the app itself)
+
+from __future__ import annotations
+import argparse
+import mmap
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+ENABLED = os.environ.get("COVER_PACK") == "1"
+COMPACT_GARBAGE_RATIO = 0.5  # compact once half the pack is dead bytes
+
+
+class PackStore:
+    def __init__(self, root: str):
+        self.pack_path = os.path.join(root, "thumbs.pack")
+        self.idx_path = os.path.join(root, "thumbs.idx")
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        self._mm: Optional[mmap.mmap] = None
+        self._mapped = 0
+        self._size = 0
+        for p in (self.pack_path, self.idx_path):
+            if not os.path.exists(p):
+                open(p, "ab").close()
+        self._load()
+
+    def _load(self) -> None:
+        entries: Dict[str, Tuple[int, int]] = {}
+        with open(self.idx_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 3:
+                    continue  # torn last line after a crash
+                name, offset, length = parts[0], int(parts[1]), int(parts[2])
+                if length:
+                    entries[name] = (offset, length)
+                else:
+                    entries.pop(name, None)
+        self._size = os.path.getsize(self.pack_path)
+        # Drop index entries pointing past the end of the pack (pack write lost in a crash)
+        self._entries = {n: (o, l) for n, (o, l) in entries.items() if o + l <= self._size}
+        self._remap()
+
+    def _remap(self) -> None:
+        """Map the pack at its current size (caller holds the lock); get() never sees a missing map."""
+        mm = None
+        if self._size:
+            with open(self.pack_path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        old, self._mm, self._mapped = self._mm, mm, self._size
+        if old is not None:
+            try:
+                old.close()
+            except BufferError:
+                pass  # slices handed out earlier still use it; it is freed once they are gone
+
+    def reload(self) -> None:
+        """Replay the index again, picking up entries appended by another process."""
+        with self._lock:
+            self._load()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, name: str) -> Optional[memoryview]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            offset, length = entry
+            if offset + length > self._mapped:
+                self._remap()
+            mm = self._mm  # the map the entry belongs to, even if another thread remaps meanwhile
+        return memoryview(mm)[offset:offset + length]
+
+    def put(self, name: str, data: bytes) -> None:
+        with self._lock:
+            # Unbuffered O_APPEND: one write lands at the current end even if another process appends
+            with open(self.pack_path, "ab", buffering=0) as f:
+                f.write(data)
+                offset = f.tell() - len(data)
+            with open(self.idx_path, "a", encoding="utf-8") as f:
+                f.write(f"{name} {offset} {len(data)}\n")
+            self._entries[name] = (offset, len(data))
+            self._size = offset + len(data)
+
+    def delete(self, names: Iterable[str]) -> None:
+        with self._lock:
+            gone = [n for n in names if self._entries.pop(n, None) is not None]
+            if gone:
+                with open(self.idx_path, "a", encoding="utf-8") as f:
+                    f.writelines(f"{n} 0 0\n" for n in gone)
+
+    def live_bytes(self) -> int:
+        return sum(length for _, length in self._entries.values())
+
+    def needs_compaction(self) -> bool:
+        return self._size > 0 and 1 - self.live_bytes() / self._size >= COMPACT_GARBAGE_RATIO
+
+    def compact(self) -> int:
+        """Rewrite pack + index with live entries only; returns bytes reclaimed."""
+        with self._lock:
+            before = self._size
+            tmp_pack, tmp_idx = f"{self.pack_path}.tmp", f"{self.idx_path}.tmp"
+            entries: Dict[str, Tuple[int, int]] = {}
+            with open(tmp_pack, "wb") as pf, open(tmp_idx, "w", encoding="utf-8") as xf:
+                for name, (offset, length) in sorted(self._entries.items(), key=lambda e: e[1][0]):
+                    new_offset = pf.tell()
+                    pf.write(self._mm[offset:offset + length])
+                    xf.write(f"{name} {new_offset} {length}\n")
+                    entries[name] = (new_offset, length)
+            # Pack first: a crash in between leaves the old index, whose entries past the end are dropped
+            os.replace(tmp_pack, self.pack_path)
+            os.replace(tmp_idx, self.idx_path)
+            self._entries = entries
+            self._size = os.path.getsize(self.pack_path)
+            self._remap()
+        print(f"🗜️ Compacted thumbnail pack: {before:,} → {self._size:,} bytes")
+        return before - self._size
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "pack_bytes": self._size, "live_bytes": self.live_bytes(),
+                "needs_compaction": self.needs_compaction()}
+
+
+def migrate(store, remove_files: bool = True) -> int:
+    """Move every per-file thumbnail of a cover_cache.CoverStore into its pack; returns how many moved."""
+    from cover_cache import variant_path
+
+    pack = store.pack or PackStore(store.root)
+    moved = 0
+    for digest, widths in store.blob_widths().items():
+        for width, ext in widths.items():
+            path = variant_path(store.blob_path(digest), width, ext)
+            name = os.path.basename(path)
+            if name in pack or not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                pack.put(name, f.read())
+            if remove_files:
+                os.remove(path)
+            moved += 1
+    print(f"📦 Moved {moved} thumbnail(s) into {pack.pack_path}")
+    return moved
+
+
+if __name__ == "__main__":
+    from cover_cache import CoverStore
+
+    parser = argparse.ArgumentParser(description="Manage the packed cover thumbnail store.")
+    parser.add_argument("command", choices=["migrate", "compact", "stats"])
+    parser.add_argument("--keep-files", action="store_true", help="migrate: leave per-file thumbnails in place")
+    args = parser.parse_args()
+    cover_store = CoverStore()
+    if args.command == "migrate":
+        migrate(cover_store, remove_files=not args.keep_files)
+    elif args.command == "compact":
+        (cover_store.pack or PackStore(cover_store.root)).compact()
+    else:
+        print((cover_store.pack or PackStore(cover_store.root)).snapshot())
@@ -2,6 +2,9 @@
 import io
 import os
 import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
 import requests
 import gspread
 import streamlit as st
@@ -15,10 +18,9 @@ from googleapiclient.errors import HttpError
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.oauth2.credentials import Credentials as UserCreds
 
-global CACHE_DIR
-
-CACHE_DIR = os.path.join(os.path.dirname(__file__), "covers_cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
+from http_guard import NEGATIVE_CACHE, breaker_for, is_failure_status
+from cover_cache import CACHE_DIR, cover_key, store
+import scheduler
 
 SCOPES_DRIVE = ["https://www.googleapis.com/auth/drive.file"]  # file-level scope is enough
 
@@ -26,40 +28,132 @@ def get_local_cover(url: str, isbn: str) -> str:
     """
     Download once, cache locally, and return the local path.
     If already cached, reuse it. Avoids re-downloading for Drive or OpenLibrary covers.
+    Concurrent calls for one cover (any thread or process) wait for a single download.
     """
     if not url:
         return ""
 
-    # Normalize identifiers
-    clean_isbn = str(isbn or "").strip()
+    identifier = cover_key(url, isbn)
+
+    # ✅ Already cached → just return ("" if what we cached was a placeholder)
+    if identifier in store():
+        return store().resolve(identifier) or ""
 
-    # Use ISBN if available; otherwise derive a stable hash from the base URL
-    import re, hashlib, urllib.parse
-    # Remove transient params (like sz=, export=, etc.)
-    parsed = urllib.parse.urlparse(url)
-    base_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-    identifier = clean_isbn if clean_isbn else hashlib.sha1(base_url.encode()).hexdigest()[:12]
+    # Recently failed, or the cover host is down → don't wait on it again
+    if NEGATIVE_CACHE.get(url):
+        return ""
+    with store().key_lock(identifier):
+        # Someone else (another session, or a backfill process) may have fetched it while we waited
+        if identifier in store():
+            return store().resolve(identifier) or ""
+        if NEGATIVE_CACHE.get(url):  # ...or just failed to
+            return ""
+        return _download_cover(url, identifier)
 
-    path = os.path.join(CACHE_DIR, f"{identifier}.jpg")
 
-    # ✅ Already cached → just return
-    if os.path.exists(path) and os.path.getsize(path) > 0:
-        # print(f"🟢 Using cached cover: {identifier}")
-        return os.path.abspath(path)
+def _download_cover(url: str, identifier: str) -> str:
+    """Fetch url into the store under identifier; the caller holds store().key_lock(identifier)."""
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        return ""
 
     # Download only once
     try:
         r = requests.get(url, timeout=12)
+        if is_failure_status(r.status_code):
+            breaker.record_failure(f"HTTP {r.status_code}")
+        else:
+            breaker.record_success()
+        if r.status_code == 404:
+            NEGATIVE_CACHE.add(url, status=404, reason="no cover")
         r.raise_for_status()
-        with open(path, "wb") as f:
-            f.write(r.content)
+        path = store().put(
+            identifier, r.content, url,
+            etag=r.headers.get("ETag", ""), last_modified=r.headers.get("Last-Modified", ""),
+        )
+        if store().is_placeholder(identifier):
+            print(f"🚫 Placeholder image for {identifier}; not used as a cover")
+            return ""
         print(f"📥 Cached cover for {identifier} → {path}")
+    except requests.RequestException as e:
+        if not isinstance(e, requests.HTTPError):
+            breaker.record_failure(str(e))
+        print(f"⚠️ Failed to download cover for {identifier}: {e}")
+        return ""
     except Exception as e:
         print(f"⚠️ Failed to download cover for {identifier}: {e}")
         return ""
 
-    return os.path.abspath(path)
+    return path
+
+
+# ---------------------------
+# Revalidation
+# ---------------------------
+
+REVALIDATE_AFTER = 7 * 24 * 3600  # cached covers are rechecked weekly
+
+def _check_url(url: str) -> str:
+    # Ask OpenLibrary for a 404 instead of its 1×1 placeholder when there is no cover
+    if "covers.openlibrary.org" in url and "default=" not in url:
+        return f"{url}{'&' if '?' in url else '?'}default=false"
+    return url
+
+def revalidate_cover(entry: dict) -> str:
+    """
+    Conditional GET for one cached cover (an entry from CoverStore.due_for_revalidation).
+    Returns 'unchanged' (304, no body), 'updated', 'gone' (404: dropped + negative-cached) or 'skipped'.
+    """
+    key, url = entry["key"], entry["url"]
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        return "skipped"
+    headers = {}
+    if not entry["placeholder"]:  # placeholders/corrupt blobs always get a full refetch
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+    try:
+        if not headers and not entry["placeholder"]:
+            # Cached before validators were recorded: a HEAD tells whether the bytes could have changed
+            h = requests.head(_check_url(url), timeout=8, allow_redirects=True)
+            size = os.path.getsize(store().blob_path(entry["hash"])) if h.ok else -1
+            if h.ok and h.headers.get("Content-Length") == str(size):
+                breaker.record_success()
+                store().mark_checked(key, h.headers.get("ETag", ""), h.headers.get("Last-Modified", ""))
+                return "unchanged"
+        r = requests.get(_check_url(url), headers=headers, timeout=12)
+    except (requests.RequestException, OSError) as e:
+        breaker.record_failure(str(e))
+        return "skipped"
+    if is_failure_status(r.status_code):
+        breaker.record_failure(f"HTTP {r.status_code}")
+        return "skipped"
+    breaker.record_success()
+    if r.status_code == 304:
+        store().mark_checked(key, r.headers.get("ETag", ""), r.headers.get("Last-Modified", ""))
+        return "unchanged"
+    if r.status_code == 404:
+        store().discard(key)
+        NEGATIVE_CACHE.add(url, status=404, reason="no cover")
+        return "gone"
+    if not r.ok:
+        return "skipped"
+    with store().key_lock(key):
+        store().put(key, r.content, url, etag=r.headers.get("ETag", ""), last_modified=r.headers.get("Last-Modified", ""))
+    return "updated"
 
+def revalidate_covers(max_age: float = REVALIDATE_AFTER, limit: int = 500) -> list:
+    """Queue background revalidation of stale cached covers; one scheduler Job per upstream."""
+    by_upstream = {}
+    for entry in store().due_for_revalidation(max_age, limit):
+        upstream = "google" if "google" in entry["url"] else "openlibrary"
+        by_upstream.setdefault(upstream, []).append(entry)
+    return [
+        scheduler.start_job(f"cover revalidation ({upstream})", upstream, revalidate_cover, entries)
+        for upstream, entries in by_upstream.items()
+    ]
 
 
 def _sa_creds():
@@ -109,54 +203,158 @@ def _user_creds():
     return creds
 
 
-def _drive_service(creds):
-    return build("drive", "v3", credentials=creds)
+# ---------------------------
+# Drive uploads
+# ---------------------------
+
+SA_NO_QUOTA = "Service Accounts do not have storage quota"
+_sa_has_quota = True  # flips on the first quota error, so later uploads go straight to OAuth
+_DRIVE_CREDS: Dict[str, object] = {}
+_DRIVE_LOCAL = threading.local()  # httplib2 isn't thread-safe: one client per thread and credential
+_DRIVE_INDEX: Dict[str, Dict[str, str]] = {}  # credential -> {md5 of content: file id in the covers folder}
+_DRIVE_LOCK = threading.Lock()
 
-def _upload_with(creds, filename: str, data: bytes) -> str:
-    drive = _drive_service(creds)
+def _drive_link(file_id: str) -> str:
+    # an embeddable link; we’ll transform to thumbnail in the app
+    return f"https://drive.google.com/uc?id={file_id}"
+
+def _drive_service(kind: str):
+    """Drive v3 client for "service_account" or "user" credentials, built once per thread."""
+    services = getattr(_DRIVE_LOCAL, "services", None)
+    if services is None:
+        services = _DRIVE_LOCAL.services = {}
+    if kind not in services:
+        with _DRIVE_LOCK:
+            creds = _DRIVE_CREDS.get(kind)
+            if creds is None:
+                creds = _DRIVE_CREDS[kind] = _sa_creds() if kind == "service_account" else _user_creds()
+        services[kind] = build("drive", "v3", credentials=creds, cache_discovery=False)
+    return services[kind]
+
+def _drive_index(kind: str) -> Dict[str, str]:
+    """
+    md5 → file id of every image in the covers folder these credentials can see, from one listing
+    per process (drive.file scope: the files this app created). Kept current as we upload.
+    """
+    with _DRIVE_LOCK:
+        index = _DRIVE_INDEX.get(kind)
+    if index is not None:
+        return index
+    drive = _drive_service(kind)
+    folder_id = st.secrets["booktracker"]["covers_folder_id"]
+    index, token = {}, None
+    while True:
+        resp = drive.files().list(
+            q=f"'{folder_id}' in parents and trashed = false",
+            fields="nextPageToken, files(id, md5Checksum)",
+            pageSize=1000,
+            pageToken=token,
+        ).execute()
+        for f in resp.get("files", []):
+            if f.get("md5Checksum"):
+                index.setdefault(f["md5Checksum"], f["id"])
+        token = resp.get("nextPageToken")
+        if not token:
+            break
+    print(f"🗂️ Indexed {len(index)} cover(s) already in Drive")
+    with _DRIVE_LOCK:
+        return _DRIVE_INDEX.setdefault(kind, index)
+
+def _upload_with(kind: str, filename: str, data: bytes) -> str:
+    """Upload unless identical bytes are already in the covers folder; returns the file's link."""
+    index = _drive_index(kind)
+    md5 = hashlib.md5(data).hexdigest()
+    if md5 in index:
+        print(f"♻️ {filename} is already in Drive; not uploading again")
+        return _drive_link(index[md5])
     folder_id = st.secrets["booktracker"]["covers_folder_id"]
     media = MediaIoBaseUpload(io.BytesIO(data), mimetype="image/jpeg", resumable=False)
-    file = drive.files().create(
+    file = _drive_service(kind).files().create(
         body={"name": filename, "parents": [folder_id], "mimeType": "image/jpeg"},
         media_body=media,
         fields="id"
     ).execute()
     file_id = file["id"]
-    # return an embeddable link; we’ll transform to thumbnail in the app
-    return f"https://drive.google.com/uc?id={file_id}"
+    with _DRIVE_LOCK:
+        index[md5] = file_id
+    return _drive_link(file_id)
 
-def save_cover_to_drive(cover_url: str, isbn: str) -> str:
+def _upload(filename: str, data: bytes) -> str:
     """Try service-account upload first, then fall back to OAuth (user-owned)."""
-    if not cover_url or not isbn:
-        return ""
+    global _sa_has_quota
+    if _sa_has_quota:
+        try:
+            return _upload_with("service_account", filename, data)
+        except HttpError as e:
+            # If this is the quota error, fall back to OAuth
+            if not (e.resp.status == 403 and SA_NO_QUOTA in str(e)):
+                print(f"⚠️ Service-account upload failed: {e}")
+                return ""
+            _sa_has_quota = False
+            print("ℹ️ Falling back to user OAuth for Drive upload (service account has no quota).")
+        except Exception as e:
+            print(f"⚠️ Upload error: {e}")
+            return ""
     try:
-        r = requests.get(cover_url, timeout=12)
-        r.raise_for_status()
-        content = r.content
-    except Exception as e:
-        print(f"⚠️ download failed for {isbn}: {e}")
+        return _upload_with("user", filename, data)
+    except Exception as inner:
+        print(f"⚠️ OAuth upload failed: {inner}")
         return ""
 
-    # 1) try service account
+def _cover_bytes(cover_url: str, isbn: str) -> bytes:
+    """Original image bytes, from the local cover cache (downloading into it first if needed)."""
+    if not get_local_cover(cover_url, isbn):
+        return b""
+    path = store().get(cover_key(cover_url, isbn))
+    if not path:
+        return b""  # evicted or discarded since it was cached
+    with open(path, "rb") as f:
+        return f.read()
+
+def save_cover_to_drive(cover_url: str, isbn: str) -> str:
+    """Copy a cover into the Drive covers folder (reusing an identical upload); returns its link or ""."""
+    if not cover_url or not isbn:
+        return ""
     try:
-        sa = _sa_creds()
-        return _upload_with(sa, f"{isbn}.jpg", content)
-    except HttpError as e:
-        # If this is the quota error, fall back to OAuth
-        if e.resp.status == 403 and "Service Accounts do not have storage quota" in str(e):
-            print("ℹ️ Falling back to user OAuth for Drive upload (service account has no quota).")
-            try:
-                user = _user_creds()
-                return _upload_with(user, f"{isbn}.jpg", content)
-            except Exception as inner:
-                print(f"⚠️ OAuth upload failed: {inner}")
-                return ""
-        else:
-            print(f"⚠️ Service-account upload failed: {e}")
-            return ""
-    except Exception as e:
-        print(f"⚠️ Upload error: {e}")
+        content = _cover_bytes(cover_url, isbn)
+    except OSError as e:
+        content = b""
+        print(f"⚠️ Could not read cached cover for {isbn}: {e}")
+    if not content:
+        print(f"⚠️ download failed for {isbn}")
         return ""
+    return _upload(f"{isbn}.jpg", content)
+
+def save_covers_to_drive(items: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    """
+    Bulk save_cover_to_drive for (cover_url, isbn) pairs; returns {isbn: link}.
+    Identical images are uploaded once. Drive's batch endpoint does not accept media uploads, so the
+    uploads run concurrently on the scheduler's Google pool (background priority) instead.
+    """
+    isbns_by_md5: Dict[str, List[str]] = {}
+    payloads: Dict[str, Tuple[str, bytes]] = {}
+    for cover_url, isbn in items:
+        if not cover_url or not isbn:
+            continue
+        try:
+            content = _cover_bytes(cover_url, isbn)
+        except OSError as e:
+            print(f"⚠️ Could not read cached cover for {isbn}: {e}")
+            continue
+        if content:
+            md5 = hashlib.md5(content).hexdigest()
+            isbns_by_md5.setdefault(md5, []).append(isbn)
+            payloads.setdefault(md5, (isbn, content))
+    futures = {
+        md5: scheduler.submit("google", _upload, f"{isbn}.jpg", content, priority=scheduler.BACKGROUND)
+        for md5, (isbn, content) in payloads.items()
+    }
+    links = {}
+    for md5, fut in futures.items():
+        link = fut.result()
+        if link:
+            links.update((isbn, link) for isbn in isbns_by_md5[md5])
+    return links
 
 def update_cover_url_in_sheet(isbn: str, local_path: str):
     """
@@ -166,24 +364,91 @@ def update_cover_url_in_sheet(isbn: str, local_path: str):
     print(f"ℹ️ Cached locally for {isbn} at {local_path} (Sheet not updated).")
 
 
-def get_cached_or_drive_cover(book: dict) -> str:
+# ---------------------------
+# Background prefetch
+# ---------------------------
+
+# Cover downloads for an expanded library section run here instead of blocking the page
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="cover-prefetch")
+_PREFETCHING: Dict[str, Future] = {}
+_PREFETCH_LOCK = threading.Lock()
+PREFETCH_RETRY_TTL = 120  # a failed prefetch is not retried for this long
+
+def _prefetch_one(url: str, isbn: str) -> str:
+    try:
+        path = get_local_cover(url, isbn)
+        if not path:
+            NEGATIVE_CACHE.add(url, reason="cover prefetch failed", ttl=PREFETCH_RETRY_TTL)
+        return path
+    finally:
+        with _PREFETCH_LOCK:
+            _PREFETCHING.pop(url, None)
+
+def prefetch_covers(books: Iterable[dict]) -> List[Future]:
+    """Queue downloads for every remote cover among books that isn't cached yet; returns pending futures."""
+    pending = []
+    for book in books:
+        url = str(book.get("cover_url", "")).strip()
+        isbn = str(book.get("isbn", "")).strip()
+        if not url.startswith("http") or NEGATIVE_CACHE.get(url):
+            continue
+        if cover_key(url, isbn) in store():
+            continue
+        with _PREFETCH_LOCK:
+            fut = _PREFETCHING.get(url)
+            if fut is None:
+                fut = _PREFETCHING[url] = _PREFETCH_POOL.submit(_prefetch_one, url, isbn)
+        pending.append(fut)
+    return pending
+
+def cover_pending(book: dict) -> bool:
+    """True while a background download of this book's cover is queued or running."""
+    with _PREFETCH_LOCK:
+        return str(book.get("cover_url", "")).strip() in _PREFETCHING
+
+
+def missing_cover_previews(books: Iterable[dict]) -> Dict[str, str]:
+    """{book id: inline preview} for books whose cover is cached but whose row has no cover_preview yet."""
+    found = {}
+    for book in books:
+        if book.get("cover_preview") or not book.get("id"):
+            continue
+        preview = store().preview(cover_key(book.get("cover_url", ""), book.get("isbn", "")))
+        if preview:
+            found[str(book["id"])] = preview
+    return found
+
+
+def is_cached_cover(cover) -> bool:
+    """True for what get_cached_or_drive_cover returns on a cache hit (a file path or packed bytes)."""
+    return isinstance(cover, bytes) or (isinstance(cover, str) and cover.startswith(CACHE_DIR))
+
+
+def get_cached_or_drive_cover(book: dict, size: str = "list", download: bool = True) -> str:
     """
     Returns a local cover path if cached or downloadable.
     Falls back to Drive/OpenLibrary URL if cache missing.
+    size ("list" or "detail", see cover_cache.VARIANTS) picks the smallest adequate thumbnail.
+    download=False never touches the network (use with prefetch_covers).
+    Cache hits are answered from the store's in-memory index (no filesystem calls). A cached cover is
+    a path under CACHE_DIR, or the thumbnail bytes when it lives in the packed store (COVER_PACK=1);
+    anything else is the remote fallback — see is_cached_cover.
     """
     isbn = str(book.get("isbn", "")).strip()
     url = str(book.get("cover_url", "")).strip()
 
-    # Case 1: local cache already exists
-    local_path = os.path.join(CACHE_DIR, f"{isbn}.jpg")
-    if os.path.exists(local_path):
-        return local_path
+    # Case 1: already in the local store (keyed by ISBN, else by cover URL)
+    key = cover_key(url, isbn)
+    local = store().image(key, size)
+    if local:
+        return local if isinstance(local, str) else local.tobytes()  # st.image wants bytes, not a view
 
     # Case 2: cover_url is a remote link — download and cache
-    if url.startswith("http"):
-        cached = get_local_cover(url, isbn)
-        if cached:
-            return cached
+    if url.startswith("http") and download:
+        if get_local_cover(url, isbn):
+            local = store().image(key, size)
+            if local:  # None if evicted/discarded by another thread in the meantime
+                return local if isinstance(local, str) else local.tobytes()
 
     # Case 3: fallback — return remote URL (for non-cached environments)
     return url
@@ -34,7 +34,8 @@ SHEET_NAME = "booktracker"
 HEADERS = [
     "id", "title", "author", "publisher", "pub_year", "pages",
     "genre", "author_gender", "fiction_nonfiction", "tags",
-    "date_finished", "cover_url", "openlibrary_id", "isbn", "word_count"
+    "date_finished", "cover_url", "openlibrary_id", "isbn", "word_count",
+    "cover_preview"  # tiny inline image (data URI) shown while the cover loads
 ]
 
 # Put your real sheet ID here (the long string from its URL)
@@ -75,7 +76,8 @@ def add_book(book):
         book.get("cover_url", ""),
         book.get("openlibrary_id", ""),
         book.get("isbn", ""),
-        book.get("word_count", "")
+        book.get("word_count", ""),
+        book.get("cover_preview", "")
     ]
     sheet.append_row(row)
     return True
@@ -122,6 +124,43 @@ def update_book_metadata_full(book_id, title, author, publisher, pub_year, pages
 
 
 
+def _update_column(column, values):
+    """
+    Write {book_id: value} into one column with a single batch update (the column's header is
+    appended first if the sheet predates it). Returns how many rows were written.
+    """
+    if not values:
+        return 0
+    sheet = _get_sheet()
+    header = sheet.row_values(1)
+    if column not in header:
+        header.append(column)
+        sheet.update_cell(1, len(header), column)
+    col = header.index(column) + 1
+    values = {str(k): v for k, v in values.items()}
+    ids = sheet.col_values(1)  # just the id column, not every record
+    updates = [
+        {"range": gspread.utils.rowcol_to_a1(i, col), "values": [[values[str(book_id)]]]}
+        for i, book_id in enumerate(ids[1:], start=2)
+        if str(book_id) in values
+    ]
+    if updates:
+        sheet.batch_update(updates, value_input_option="RAW")
+    return len(updates)
+
+def update_cover_previews(previews):
+    """Write {book_id: preview} into the cover_preview column."""
+    return _update_column("cover_preview", previews)
+
+def update_cover_urls(urls):
+    """Write {book_id: cover_url} in one batch update (bulk cover backfill)."""
+    return _update_column("cover_url", urls)
+
+def update_columns(columns):
+    """Write {column: {book_id: value}}, one batch update per column (bulk metadata backfill)."""
+    return sum(_update_column(column, values) for column, values in columns.items())
+
+
 def delete_book(book_id):
     sheet = _get_sheet()
     rows = sheet.get_all_records()
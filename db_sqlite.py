@@ -28,9 +28,14 @@ def init_db():
             cover_url TEXT,
             openlibrary_id TEXT,
             isbn TEXT,
-            word_count INTEGER
+            word_count INTEGER,
+            cover_preview TEXT
         )
         """)
+        # Databases created before cover previews existed
+        columns = {row["name"] for row in cur.execute("PRAGMA table_info(books)")}
+        if "cover_preview" not in columns:
+            cur.execute("ALTER TABLE books ADD COLUMN cover_preview TEXT")
         conn.commit()
 
 def _safe_int(v):
@@ -50,8 +55,9 @@ def add_book(book_data):
             INSERT INTO books (
                 title, author, publisher, pub_year, pages, genre,
                 author_gender, fiction_nonfiction, tags,
-                date_finished, cover_url, openlibrary_id, isbn, word_count
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                date_finished, cover_url, openlibrary_id, isbn, word_count,
+                cover_preview
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             book_data.get("title"),
             book_data.get("author"),
@@ -67,6 +73,7 @@ def add_book(book_data):
             book_data.get("openlibrary_id"),
             book_data.get("isbn"),
             _safe_word_count(book_data.get("pages")),
+            book_data.get("cover_preview"),
         ))
         conn.commit()
 
@@ -96,6 +103,29 @@ def update_book_metadata_full(book_id, title, author, publisher, pub_year, pages
         ))
         conn.commit()
 
+def _update_column(column, values):
+    """Write {book_id: value} into one column (a fixed column name, never user input)."""
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            f"UPDATE books SET {column}=? WHERE id=?",
+            [(value, book_id) for book_id, value in values.items()],
+        )
+        conn.commit()
+        return cur.rowcount
+
+def update_cover_previews(previews):
+    """Write {book_id: preview} into the cover_preview column."""
+    return _update_column("cover_preview", previews)
+
+def update_cover_urls(urls):
+    """Write {book_id: cover_url} in one transaction (bulk cover backfill)."""
+    return _update_column("cover_url", urls)
+
+def update_columns(columns):
+    """Write {column: {book_id: value}}, one transaction per column (bulk metadata backfill)."""
+    return sum(_update_column(column, values) for column, values in columns.items())
+
 def delete_book(book_id):
     with get_connection() as conn:
         cur = conn.cursor()
@@ -0,0 +1,142 @@
+# fuzzy_index.py
+# Typo-tolerant title/author matching with an in-memory trigram index.
+
+from __future__ import annotations
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: Any) -> str:
+    """'Le Petit Prince — Saint-Exupéry' -> 'le petit prince saint exupery'"""
+    s = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    return _NON_WORD.sub(" ", s.lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word, padded so short words and word starts still count."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Inverted index trigram -> doc ids. search() scores candidates by how much of the query
+    they cover (containment) blended with overall similarity (Dice), so 'stand kign' still
+    finds 'The Stand — Stephen King' and shorter, closer titles rank first.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._sizes: List[int] = []
+        self._payloads: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def add(self, text: str, payload: Any) -> int:
+        doc_id = len(self._payloads)
+        grams = trigrams(normalize(text))
+        for g in grams:
+            self._postings[g].append(doc_id)
+        self._sizes.append(len(grams))
+        self._payloads.append(payload)
+        return doc_id
+
+    def search(
+        self, query: str, limit: int = 10, min_score: float = 0.3, containment_weight: float = 0.7,
+    ) -> List[Tuple[float, Any]]:
+        """
+        Return [(score, payload)] best first; score is in [0, 1].
+        containment_weight=0 gives plain Dice similarity (whole-string match, used for duplicate checks).
+        """
+        q = trigrams(normalize(query))
+        if not q:
+            return []
+        hits: Counter = Counter()
+        for g in q:
+            for doc_id in self._postings.get(g, ()):
+                hits[doc_id] += 1
+
+        scored = []
+        for doc_id, common in hits.items():
+            containment = common / len(q)
+            dice = 2 * common / (len(q) + self._sizes[doc_id])
+            score = containment_weight * containment + (1 - containment_weight) * dice
+            if score >= min_score:
+                scored.append((score, doc_id))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [(round(s, 3), self._payloads[d]) for s, d in scored[:limit]]
+
+
+# ---------------------------
+# Library / catalog indexes
+# ---------------------------
+
+class LibraryIndex:
+    """Two trigram indexes over a set of books: titles alone, and 'title author' combined."""
+
+    def __init__(self, books: Iterable[Dict[str, Any]] = ()):
+        self.titles = TrigramIndex()
+        self.combined = TrigramIndex()
+        for b in books:
+            self.add(b)
+
+    def add(self, book: Dict[str, Any]) -> None:
+        title = book.get("title") or ""
+        author = book.get("author") or ""
+        self.titles.add(title, book)
+        self.combined.add(f"{title} {author}", book)
+
+    def find(self, query: str, limit: int = 20, min_score: float = 0.45) -> List[Tuple[float, Dict[str, Any]]]:
+        """'Find in my library': ranked typo-tolerant matches on title and/or author."""
+        return self.combined.search(query, limit=limit, min_score=min_score)
+
+    def shelved_match(
+        self, query: str, threshold: float = 0.7, margin: float = 0.1,
+    ) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """
+        Best match if the query almost certainly names a shelved book: its title (typos allowed), or
+        its whole title followed by the author, clearly ahead of any other shelved title.
+        An author alone never counts ('stephen king' is not a search for the one King book shelved).
+        """
+        q_words = set(normalize(query).split())
+        best: Dict[str, Tuple[float, Dict[str, Any]]] = {}   # normalized title -> best hit
+        hits = self.titles.search(query, limit=3, min_score=threshold, containment_weight=0.0)
+        hits += [
+            h for h in self.combined.search(query, limit=3, min_score=threshold, containment_weight=0.0)
+            if set(normalize(h[1].get("title")).split()) <= q_words
+        ]
+        for score, book in hits:
+            title = normalize(book.get("title"))
+            if title and (title not in best or score > best[title][0]):
+                best[title] = (score, book)
+        ranked = sorted(best.values(), key=lambda h: -h[0])
+        if not ranked or (len(ranked) > 1 and ranked[0][0] - ranked[1][0] < margin):
+            return None
+        return ranked[0]
+
+
+def catalog_index(max_works: int = 200000) -> Optional[TrigramIndex]:
+    """Trigram index over works in the local OpenLibrary catalog (payload = search-style doc), if present."""
+    import ol_catalog
+
+    if not ol_catalog.catalog_available():
+        return None
+    idx = TrigramIndex()
+    for doc in ol_catalog.iter_works(limit=max_works):
+        idx.add(f"{doc['title']} {' '.join(doc['author_name'])}", doc)
+    return idx
+
+
+@lru_cache(maxsize=1)
+def shared_catalog_index() -> Optional[TrigramIndex]:
+    """Process-wide catalog_index(), built on first use (safe to call from worker threads)."""
+    return catalog_index()
@@ -0,0 +1,265 @@
+# http_guard.py
+# Response caching (positive and negative) and per-endpoint circuit breakers for external HTTP calls.
+
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+NEGATIVE_TTL = 600        # 404s / "no such ISBN" are remembered for 10 min
+EMPTY_RESULT_TTL = 120    # empty searches are likely typos; keep them briefly
+RESPONSE_TTL = 6 * 3600   # OpenLibrary records change rarely
+RESPONSE_MAX_ENTRIES = 5000
+RESPONSE_MAX_BYTES = 64 * 1024 * 1024  # serialized size of everything cached; big pages count for what they are
+FAILURE_THRESHOLD = 3     # consecutive timeouts/5xx before a breaker opens
+COOLDOWN = 30.0           # seconds an open breaker fails fast before probing again
+
+
+# ---------------------------
+# Negative cache
+# ---------------------------
+
+class NegativeCache:
+    """Thread-safe TTL set of keys (usually URLs) known to have no result."""
+
+    def __init__(self, ttl: float = NEGATIVE_TTL, max_entries: int = 5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def add(self, key: str, status: Optional[int] = None, reason: str = "", ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries first, then the oldest ones
+                self._entries = {k: v for k, v in self._entries.items() if v["expires"] > now}
+                for k in sorted(self._entries, key=lambda k: self._entries[k]["expires"])[: self.max_entries // 10 or 1]:
+                    self._entries.pop(k, None)
+            self._entries[key] = {"status": status, "reason": reason, "expires": now + (ttl or self.ttl)}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for key if it is still fresh, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires"] <= time.time():
+                self._entries.pop(key, None)
+                return None
+            self.hits += 1
+            return entry
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            live = sum(1 for v in self._entries.values() if v["expires"] > now)
+            return {"entries": live, "hits": self.hits, "ttl": self.ttl}
+
+
+# ---------------------------
+# Response cache
+# ---------------------------
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of successful JSON payloads keyed by URL, bounded by count and bytes."""
+
+    def __init__(self, ttl: float = RESPONSE_TTL, max_entries: int = RESPONSE_MAX_ENTRIES,
+                 max_bytes: int = RESPONSE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()   # url -> (expires, payload, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key)[2]
+
+    def put(self, key: str, payload: Any, ttl: Optional[float] = None) -> None:
+        try:
+            size = len(json.dumps(payload, separators=(",", ":")))
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes // 8:
+                return  # one page may not crowd out everything else
+            self._entries[key] = (time.time() + (ttl or self.ttl), payload, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+# ---------------------------
+# Circuit breaker
+# ---------------------------
+
+class CircuitBreaker:
+    """
+    closed    → calls pass; FAILURE_THRESHOLD consecutive failures open the breaker.
+    open      → calls fail fast until `cooldown` has elapsed.
+    half_open → exactly one probe call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error = ""
+        self.rejected = 0
+        self.trips = 0  # times the breaker has opened; shown in the status panel
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.time() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, error: str = "") -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = error[:200]
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.time()
+
+    def reset(self) -> None:
+        self.record_success()
+        with self._lock:
+            self.rejected = 0
+            self.last_error = ""
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = max(0.0, self.cooldown - (time.time() - self.opened_at)) if self.state == "open" else 0.0
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "trips": self.trips,
+                "retry_in_s": round(retry_in, 1),
+                "last_error": self.last_error,
+            }
+
+
+# ---------------------------
+# Shared registry
+# ---------------------------
+
+NEGATIVE_CACHE = NegativeCache()
+RESPONSE_CACHE = ResponseCache()
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+def endpoint_for(url: str) -> str:
+    """Classify a URL into a breaker name, e.g. 'openlibrary:isbn' or 'covers'."""
+    parsed = urlparse(url)
+    host, path = parsed.netloc.lower(), parsed.path
+    if host.startswith("covers."):
+        return "openlibrary:covers"
+    if "openlibrary.org" in host:
+        if path.startswith("/search"):
+            return "openlibrary:search"
+        if path.startswith("/api/books"):
+            return "openlibrary:bibkeys"
+        if path.endswith("/editions.json"):
+            return "openlibrary:editions"
+        for kind in ("isbn", "books", "works", "authors"):
+            if path.startswith(f"/{kind}/"):
+                return f"openlibrary:{kind}"
+        return "openlibrary"
+    return host or "unknown"
+
+def breaker_for(url_or_name: str) -> CircuitBreaker:
+    name = endpoint_for(url_or_name) if "://" in url_or_name else url_or_name
+    with _BREAKERS_LOCK:
+        br = _BREAKERS.get(name)
+        if br is None:
+            br = _BREAKERS[name] = CircuitBreaker(name)
+        return br
+
+def is_failure_status(status: Optional[int]) -> bool:
+    """Statuses that say the upstream is unhealthy (as opposed to 'no such thing')."""
+    return status is not None and (status >= 500 or status == 429)
+
+def status_snapshot() -> Dict[str, Any]:
+    """State of every breaker plus cache stats, for the debug panel."""
+    with _BREAKERS_LOCK:
+        breakers = {name: br.snapshot() for name, br in sorted(_BREAKERS.items())}
+    return {
+        "breakers": breakers,
+        "negative_cache": NEGATIVE_CACHE.snapshot(),
+        "response_cache": RESPONSE_CACHE.snapshot(),
+    }
+
+def reset_all() -> None:
+    NEGATIVE_CACHE.clear()
+    RESPONSE_CACHE.clear()
+    with _BREAKERS_LOCK:
+        for br in _BREAKERS.values():
+            br.reset()
@@ -0,0 +1,324 @@
+# ol_catalog.py
+# Local, indexed SQLite copy of (a subset of) the OpenLibrary catalog, built by ol_dump_import.py.
+# openlibrary_local consults it before going to openlibrary.org; see answer().
+
+from __future__ import annotations
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+CATALOG_DB = os.environ.get("OL_CATALOG_DB") or os.path.join(os.path.dirname(__file__), "ol_catalog.db")
+# With OL_CATALOG_ONLY=1, catalog misses are final instead of falling through to openlibrary.org
+CATALOG_ONLY = os.environ.get("OL_CATALOG_ONLY") == "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS authors (
+    key TEXT PRIMARY KEY,
+    name TEXT,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS works (
+    key TEXT PRIMARY KEY,
+    title TEXT,
+    data TEXT,
+    first_year INTEGER,
+    cover_id INTEGER,
+    edition_count INTEGER DEFAULT 0,
+    langs TEXT
+);
+CREATE TABLE IF NOT EXISTS work_authors (
+    work_key TEXT,
+    author_key TEXT,
+    PRIMARY KEY (work_key, author_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_work_authors_author ON work_authors(author_key);
+CREATE TABLE IF NOT EXISTS editions (
+    key TEXT PRIMARY KEY,
+    work_key TEXT,
+    lang TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_editions_work ON editions(work_key);
+CREATE TABLE IF NOT EXISTS isbns (
+    isbn TEXT PRIMARY KEY,
+    edition_key TEXT
+) WITHOUT ROWID;
+"""
+
+_local = threading.local()
+
+
+# ---------------------------
+# Connections
+# ---------------------------
+
+def connect(path: str = CATALOG_DB, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def catalog_available() -> bool:
+    return os.path.exists(CATALOG_DB) and os.path.getsize(CATALOG_DB) > 0
+
+def _conn() -> Optional[sqlite3.Connection]:
+    """Per-thread read-only connection, or None when no catalog has been imported."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        if not catalog_available():
+            return None
+        try:
+            conn = _local.conn = connect(CATALOG_DB, readonly=True)
+        except sqlite3.Error:
+            return None
+    return conn
+
+def has_fts(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'works_fts'").fetchone()
+    return row is not None
+
+def finalize(conn: sqlite3.Connection) -> None:
+    """Recompute per-work aggregates and rebuild the title/author full-text index after an import."""
+    conn.executescript("""
+        UPDATE works SET
+            edition_count = (SELECT COUNT(*) FROM editions e WHERE e.work_key = works.key),
+            langs = (SELECT group_concat(DISTINCT e.lang) FROM editions e
+                     WHERE e.work_key = works.key AND e.lang IS NOT NULL AND e.lang != '');
+    """)
+    conn.execute("DROP TABLE IF EXISTS works_fts")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE works_fts USING fts5(title, authors, content='')")
+    except sqlite3.OperationalError:
+        print("ℹ️ SQLite built without FTS5; catalog search will fall back to LIKE.")
+        conn.commit()
+        return
+    conn.execute("""
+        INSERT INTO works_fts(rowid, title, authors)
+        SELECT w.rowid, w.title, COALESCE(group_concat(a.name, ' '), '')
+        FROM works w
+        LEFT JOIN work_authors wa ON wa.work_key = w.key
+        LEFT JOIN authors a ON a.key = wa.author_key
+        GROUP BY w.rowid
+    """)
+    conn.commit()
+
+
+# ---------------------------
+# Lookups
+# ---------------------------
+
+def _load(row) -> Optional[Dict[str, Any]]:
+    return json.loads(row["data"]) if row and row["data"] else None
+
+def get_record(key: str) -> Optional[Dict[str, Any]]:
+    """Compact JSON for '/works/..', '/books/..' or '/authors/..', or None if not in the catalog."""
+    conn = _conn()
+    if conn is None:
+        return None
+    table = {"/works/": "works", "/books/": "editions", "/authors/": "authors"}.get(key[: key.find("/", 1) + 1])
+    if not table:
+        return None
+    return _load(conn.execute(f"SELECT data FROM {table} WHERE key = ?", (key,)).fetchone())
+
+def edition_by_isbn(isbn: str) -> Optional[Dict[str, Any]]:
+    conn = _conn()
+    if conn is None:
+        return None
+    row = conn.execute(
+        "SELECT e.data FROM isbns i JOIN editions e ON e.key = i.edition_key WHERE i.isbn = ?",
+        (re.sub(r"[^0-9Xx]", "", isbn).upper(),),
+    ).fetchone()
+    return _load(row)
+
+def editions_for_work(work_key: str, limit: int = 50, offset: int = 0) -> Optional[Dict[str, Any]]:
+    """editions.json-shaped {'entries': [...], 'size': n}, or None if the work isn't in the catalog."""
+    conn = _conn()
+    if conn is None:
+        return None
+    if not conn.execute("SELECT 1 FROM works WHERE key = ?", (work_key,)).fetchone():
+        return None
+    size = conn.execute("SELECT COUNT(*) FROM editions WHERE work_key = ?", (work_key,)).fetchone()[0]
+    rows = conn.execute(
+        "SELECT data FROM editions WHERE work_key = ? ORDER BY key LIMIT ? OFFSET ?",
+        (work_key, limit, offset),
+    ).fetchall()
+    return {"entries": [_load(r) for r in rows], "size": size}
+
+def _fts_query(text: str, column: str) -> str:
+    toks = re.findall(r"\w+", text.lower())
+    return " ".join(f'{column}:"{t}"*' for t in toks)
+
+def _search_sql(conn, q, title, author, year) -> Optional[Tuple[str, List[Any], str]]:
+    """(sql, args, order) selecting the matching works, or None when there is nothing to match on."""
+    if not (q or title or author):
+        return None
+    where, args = [], []
+    if has_fts(conn):
+        match = " ".join(filter(None, [
+            " ".join(f'"{t}"*' for t in re.findall(r"\w+", (q or "").lower())),
+            _fts_query(title or "", "title"),
+            _fts_query(author or "", "authors"),
+        ]))
+        if not match:
+            return None
+        sql = ("SELECT w.* FROM works_fts f JOIN works w ON w.rowid = f.rowid "
+               "WHERE works_fts MATCH ?")
+        args.append(match)
+        order = "ORDER BY bm25(works_fts), w.edition_count DESC"
+    else:
+        sql = "SELECT w.* FROM works w WHERE 1=1"
+        for text in filter(None, [q, title]):
+            where.append("w.title LIKE ?")
+            args.append(f"%{text}%")
+        if author:
+            where.append("w.key IN (SELECT wa.work_key FROM work_authors wa JOIN authors a "
+                         "ON a.key = wa.author_key WHERE a.name LIKE ?)")
+            args.append(f"%{author}%")
+        order = "ORDER BY w.edition_count DESC"
+    if year:
+        where.append("w.first_year = ?")
+        args.append(int(year))
+    if where:
+        sql += " AND " + " AND ".join(where)
+    return sql, args, order
+
+
+def search(
+    q: Optional[str] = None,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    year: Optional[int] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """Search works; returns search.json-shaped docs (key, title, author_name, edition_count, ...)."""
+    conn = _conn()
+    query = _search_sql(conn, q, title, author, year) if conn is not None else None
+    if query is None:
+        return []
+    sql, args, order = query
+    rows = conn.execute(f"{sql} {order} LIMIT ?", (*args, limit)).fetchall()
+
+    docs = []
+    for r in rows:
+        authors = conn.execute(
+            "SELECT a.key, a.name FROM work_authors wa JOIN authors a ON a.key = wa.author_key "
+            "WHERE wa.work_key = ?", (r["key"],),
+        ).fetchall()
+        docs.append({
+            "key": r["key"],
+            "title": r["title"],
+            "author_name": [a["name"] for a in authors if a["name"]],
+            "author_key": [a["key"].rsplit("/", 1)[-1] for a in authors],
+            "first_publish_year": r["first_year"],
+            "edition_count": r["edition_count"],
+            "cover_i": r["cover_id"],
+            "language": (r["langs"] or "").split(",") if r["langs"] else [],
+        })
+    return docs
+
+
+def count_matches(
+    q: Optional[str] = None,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    year: Optional[int] = None,
+) -> int:
+    """How many works search() would find without a limit (search.json's numFound)."""
+    conn = _conn()
+    query = _search_sql(conn, q, title, author, year) if conn is not None else None
+    if query is None:
+        return 0
+    sql, args, _ = query
+    return conn.execute(f"SELECT COUNT(*) FROM ({sql})", args).fetchone()[0]
+
+
+def iter_works(limit: Optional[int] = None):
+    """Yield search-style docs for catalog works, most-edited first (for building other indexes)."""
+    conn = _conn()
+    if conn is None:
+        return
+    rows = conn.execute(
+        """
+        SELECT w.key, w.title, w.first_year, w.cover_id, w.edition_count,
+               (SELECT group_concat(a.name, ', ') FROM work_authors wa
+                  JOIN authors a ON a.key = wa.author_key WHERE wa.work_key = w.key) AS authors
+        FROM works w ORDER BY w.edition_count DESC LIMIT ?
+        """,
+        (limit if limit is not None else -1,),
+    )
+    for r in rows:
+        yield {
+            "key": r["key"],
+            "title": r["title"],
+            "author_name": (r["authors"] or "").split(", ") if r["authors"] else [],
+            "first_publish_year": r["first_year"],
+            "edition_count": r["edition_count"],
+            "cover_i": r["cover_id"],
+        }
+
+
+# ---------------------------
+# URL-level answers for openlibrary_local
+# ---------------------------
+
+_RECORD_RE = re.compile(r"^(/(?:works|books|authors)/OL\w+)\.json$")
+_EDITIONS_RE = re.compile(r"^(/works/OL\w+)/editions\.json$")
+_ISBN_RE = re.compile(r"^/isbn/([0-9Xx-]+)\.json$")
+
+def answer(url: str) -> Optional[Dict[str, Any]]:
+    """
+    Serve an openlibrary.org JSON URL from the local catalog.
+    Returns the payload the API would have returned, or None when the catalog can't answer
+    (no catalog, record unknown, non-OpenLibrary URL) so the caller can go to the network.
+    """
+    parsed = urlparse(url)
+    if "openlibrary.org" not in parsed.netloc or parsed.netloc.startswith("covers.") or not catalog_available():
+        return None
+    path = parsed.path
+    params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+    def _int(name, default):
+        try:
+            return int(params.get(name, default))
+        except ValueError:
+            return default
+
+    m = _RECORD_RE.match(path)
+    if m:
+        return get_record(m.group(1))
+    m = _ISBN_RE.match(path)
+    if m:
+        return edition_by_isbn(m.group(1))
+    m = _EDITIONS_RE.match(path)
+    if m:
+        return editions_for_work(m.group(1), limit=_int("limit", 50), offset=_int("offset", 0))
+    if path == "/search.json":
+        criteria = dict(
+            q=params.get("q"), title=params.get("title"), author=params.get("author"),
+            year=_int("first_publish_year", 0) or None,
+        )
+        limit = _int("limit", 20)
+        docs = search(**criteria, limit=limit)
+        if not docs and not CATALOG_ONLY:
+            return None
+        # A full page may be cut off: report the real match count, as search.json does
+        num_found = count_matches(**criteria) if len(docs) >= limit else len(docs)
+        return {"numFound": num_found, "docs": docs}
+    if path == "/api/books" and params.get("bibkeys"):
+        out = {}
+        for bib in params["bibkeys"].split(","):
+            ed = edition_by_isbn(bib.split(":", 1)[-1]) if bib.upper().startswith("ISBN:") else None
+            if ed:
+                out[bib] = {"bib_key": bib, "info_url": f"https://openlibrary.org{ed.get('key', '')}", "details": ed}
+        # Partial hits still need the network for the rest of the batch
+        if len(out) < len(params["bibkeys"].split(",")) and not CATALOG_ONLY:
+            return None
+        return out
+    return None
@@ -0,0 +1,103 @@
+# ol_dates.py
+# Fast, exception-free normalization of OpenLibrary publish dates into sortable keys.
+
+from __future__ import annotations
+import calendar
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Tuple
+
+# Sort key = (year, month, day). Empty dates sort first, unparseable dates last,
+# matching the old strptime-loop behaviour (datetime(1,1,1) / datetime(9999,12,31)).
+DateKey = Tuple[int, int, int]
+EMPTY_KEY: DateKey = (1, 1, 1)
+UNKNOWN_KEY: DateKey = (9999, 12, 31)
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_MON = (
+    r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?"
+    r"|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+)
+_YEAR = r"\d{4}"
+
+# One compiled alternation covers every format we have seen in OpenLibrary data:
+#   "1998-01-05", "1998-01", "01/05/1998", "Jan 5, 1998", "January 5th 1998",
+#   "5 January 1998", "January 1998", "1998", "c1998", "[1965]", "1st ed. 2001"
+# The most specific shapes come first; the bare-year branch is the catch-all.
+_DATE_RE = re.compile(
+    rf"""
+      (?<!\d)(?P<iso_y>{_YEAR})-(?P<iso_m>\d{{1,2}})(?:-(?P<iso_d>\d{{1,2}}))?(?!\d)
+    | (?<!\d)(?P<us_m>\d{{1,2}})/(?P<us_d>\d{{1,2}})/(?P<us_y>{_YEAR})(?!\d)
+    | \b(?P<mdy_mon>{_MON})\b\.?\s*(?P<mdy_d>\d{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<mdy_y>{_YEAR})(?!\d)
+    | (?<!\d)(?P<dmy_d>\d{{1,2}})(?:st|nd|rd|th)?\s+(?P<dmy_mon>{_MON})\b\.?,?\s+(?P<dmy_y>{_YEAR})(?!\d)
+    | \b(?P<my_mon>{_MON})\b\.?,?\s+(?P<my_y>{_YEAR})(?!\d)
+    | (?<!\d)(?P<y>1[0-9]{{3}}|20[0-9]{{2}})(?!\d)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def _mon(token: str) -> int:
+    return _MONTHS.get(token[:3].lower(), 1)
+
+
+def _key(y: str, m: Any = None, d: Any = None) -> DateKey:
+    year = int(y)
+    if year < 1:
+        return UNKNOWN_KEY  # "0000-01-01": no such year, and datetime() would reject it
+    month = int(m) if m else 1
+    day = int(d) if d else 1
+    # Out-of-range parts degrade to a coarser precision instead of failing the whole date
+    if not 1 <= month <= 12:
+        month, day = 1, 1
+    if not 1 <= day <= calendar.monthrange(year, month)[1]:
+        day = 1  # "1998-02-30", "June 31, 1998"
+    return (year, month, day)
+
+
+@lru_cache(maxsize=65536)
+def _date_key_cached(text: str) -> DateKey:
+    if not text:
+        return EMPTY_KEY
+    m = _DATE_RE.search(text)
+    if not m:
+        return UNKNOWN_KEY
+    g = m.groupdict()
+    if g["iso_y"]:
+        return _key(g["iso_y"], g["iso_m"], g["iso_d"])
+    if g["us_y"]:
+        return _key(g["us_y"], g["us_m"], g["us_d"])
+    if g["mdy_y"]:
+        return _key(g["mdy_y"], _mon(g["mdy_mon"]), g["mdy_d"])
+    if g["dmy_y"]:
+        return _key(g["dmy_y"], _mon(g["dmy_mon"]), g["dmy_d"])
+    if g["my_y"]:
+        return _key(g["my_y"], _mon(g["my_mon"]))
+    return _key(g["y"])
+
+
+def ol_date_key(raw: Any) -> DateKey:
+    """
+    Return a sortable (year, month, day) key for an OpenLibrary publish_date.
+    Never raises; results are memoized by the stripped raw string.
+    """
+    if raw is None:
+        return EMPTY_KEY
+    return _date_key_cached(str(raw).strip())
+
+
+def ol_date(raw: Any) -> datetime:
+    """Same as ol_date_key, but as a datetime (for callers that sort on datetimes)."""
+    return datetime(*ol_date_key(raw))
+
+
+def ol_year(raw: Any) -> int | None:
+    """Publication year, or None when the date is empty or unparseable."""
+    key = ol_date_key(raw)
+    return None if key in (EMPTY_KEY, UNKNOWN_KEY) else key[0]
+
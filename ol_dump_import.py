@@ -0,0 +1,168 @@
+# ol_dump_import.py
+# Stream OpenLibrary bulk dumps (works / editions / authors, or the combined "all types" dump)
+# into the compact local catalog used by ol_catalog.py.
+#
+# Dump format: gzipped TSV, one record per line:
+#   type \t key \t revision \t last_modified \t JSON
+#
+# Usage:
+#   python ol_dump_import.py ol_dump_authors_latest.txt.gz ol_dump_works_latest.txt.gz \
+#       ol_dump_editions_latest.txt.gz [--db ol_catalog.db]
+#   python ol_dump_import.py fixtures/ol_dump_sample.txt.gz --db /tmp/ol_catalog_test.db
+
+from __future__ import annotations
+import argparse
+import gzip
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import ol_catalog
+from ol_dates import ol_year
+
+BATCH_SIZE = 5000
+
+# Only the fields the app reads are kept, so the catalog stays a fraction of the dump size
+WORK_FIELDS = ("key", "title", "subtitle", "authors", "covers", "subjects", "description", "first_publish_date")
+EDITION_FIELDS = (
+    "key", "title", "subtitle", "works", "authors", "publishers", "publish_date", "number_of_pages",
+    "pagination", "isbn_10", "isbn_13", "languages", "covers", "subjects", "description",
+)
+MAX_SUBJECTS = 10
+
+
+# ---------------------------
+# Parsing
+# ---------------------------
+
+def iter_records(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (type, json) per line; bounded memory regardless of dump size. Bad lines are skipped."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            parts = line.rstrip("\n").split("\t", 4)
+            if len(parts) != 5:
+                continue
+            try:
+                yield parts[0], json.loads(parts[4])
+            except ValueError:
+                continue
+
+def _compact(rec: Dict[str, Any], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    out = {k: rec[k] for k in fields if rec.get(k) not in (None, "", [], {})}
+    if "subjects" in out:
+        out["subjects"] = out["subjects"][:MAX_SUBJECTS]
+    # Dump authors look like {"author": {"key": ...}, "type": ...} on works, {"key": ...} on editions
+    if "authors" in out:
+        keys = []
+        for a in out["authors"]:
+            a = a or {}
+            key = (a.get("author") or {}).get("key") if isinstance(a.get("author"), dict) else a.get("key")
+            if key:
+                keys.append({"key": key})
+        out["authors"] = keys
+    return out
+
+def _dumps(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+def _first_cover(rec: Dict[str, Any]) -> Optional[int]:
+    covers = [c for c in rec.get("covers") or [] if isinstance(c, int) and c > 0]
+    return covers[0] if covers else None
+
+
+# ---------------------------
+# Import
+# ---------------------------
+
+class _Batches:
+    """Buffers rows per statement and flushes them with executemany every BATCH_SIZE rows."""
+
+    SQL = {
+        "authors": "INSERT OR REPLACE INTO authors (key, name, data) VALUES (?, ?, ?)",
+        "works": "INSERT OR REPLACE INTO works (key, title, data, first_year, cover_id) VALUES (?, ?, ?, ?, ?)",
+        "work_authors": "INSERT OR IGNORE INTO work_authors (work_key, author_key) VALUES (?, ?)",
+        "editions": "INSERT OR REPLACE INTO editions (key, work_key, lang, data) VALUES (?, ?, ?, ?)",
+        "isbns": "INSERT OR REPLACE INTO isbns (isbn, edition_key) VALUES (?, ?)",
+    }
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows: Dict[str, List[tuple]] = {k: [] for k in self.SQL}
+        self.pending = 0
+
+    def add(self, table: str, row: tuple) -> None:
+        self.rows[table].append(row)
+        self.pending += 1
+        if self.pending >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        for table, rows in self.rows.items():
+            if rows:
+                self.conn.executemany(self.SQL[table], rows)
+                rows.clear()
+        self.conn.commit()
+        self.pending = 0
+
+def _add_record(batches: _Batches, rtype: str, rec: Dict[str, Any]) -> bool:
+    key = rec.get("key")
+    if not key:
+        return False
+    if rtype == "/type/author":
+        data = {"key": key, "name": rec.get("name") or rec.get("personal_name") or ""}
+        batches.add("authors", (key, data["name"], _dumps(data)))
+    elif rtype == "/type/work":
+        data = _compact(rec, WORK_FIELDS)
+        batches.add("works", (key, data.get("title") or "", _dumps(data),
+                              ol_year(data.get("first_publish_date")), _first_cover(data)))
+        for a in data.get("authors", []):
+            batches.add("work_authors", (key, a["key"]))
+    elif rtype == "/type/edition":
+        data = _compact(rec, EDITION_FIELDS)
+        works = data.get("works") or []
+        work_key = (works[0] or {}).get("key") if works else None
+        langs = data.get("languages") or []
+        lang = ((langs[0] or {}).get("key") or "").rsplit("/", 1)[-1] if langs else ""
+        batches.add("editions", (key, work_key, lang, _dumps(data)))
+        for isbn in (data.get("isbn_13") or []) + (data.get("isbn_10") or []):
+            clean = "".join(ch for ch in str(isbn) if ch.isalnum()).upper()
+            if clean:
+                batches.add("isbns", (clean, key))
+    else:
+        return False
+    return True
+
+def import_dumps(paths: List[str], db_path: str = ol_catalog.CATALOG_DB, progress_every: int = 100000) -> Dict[str, int]:
+    """Import one or more dump files into db_path; returns per-type record counts."""
+    conn = ol_catalog.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    batches = _Batches(conn)
+    counts: Dict[str, int] = {}
+    t0 = time.time()
+    try:
+        for path in paths:
+            print(f"📥 Importing {path}")
+            for n, (rtype, rec) in enumerate(iter_records(path), start=1):
+                if _add_record(batches, rtype, rec):
+                    counts[rtype] = counts.get(rtype, 0) + 1
+                if progress_every and n % progress_every == 0:
+                    print(f"   … {n:,} lines ({time.time() - t0:.0f}s)")
+        batches.flush()
+        print("🔧 Building indexes…")
+        ol_catalog.finalize(conn)
+        # Back to a plain rollback journal so the app can open the catalog read-only
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+    print(f"✅ Imported {counts} in {time.time() - t0:.1f}s → {db_path}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import OpenLibrary dumps into a local catalog.")
+    parser.add_argument("dumps", nargs="+", help="ol_dump_*.txt.gz files")
+    parser.add_argument("--db", default=ol_catalog.CATALOG_DB, help="catalog SQLite path")
+    args = parser.parse_args()
+    import_dumps(args.dumps, db_path=args.db)
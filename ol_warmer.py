@@ -0,0 +1,180 @@
+# ol_warmer.py
+# Opt-in background warmer: walks the OpenLibrary ids/ISBNs already in the library and fills the
+# shared OpenLibrary response cache (work JSON, first editions page, author names, cover availability)
+# so the edition picker and enrichment start warm.
+#
+# It runs on one daemon thread; its requests go through the scheduler at BACKGROUND priority, and
+# each one also waits until no interactive OpenLibrary request has run for `idle_gap` seconds.
+# It stops by itself once every item has been visited (i.e. the cache is warm).
+
+from __future__ import annotations
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+import openlibrary_local as olm
+import scheduler
+from http_guard import NEGATIVE_CACHE, RESPONSE_CACHE, breaker_for, is_failure_status
+
+IDLE_GAP = 3.0      # seconds of interactive silence required before each background request
+PACE = 0.5          # seconds between background network requests
+
+
+def _background_get(url: str):
+    """Runs on a scheduler worker; marks the request as background traffic."""
+    with olm.background_requests():
+        return olm._shared_get_json(url, timeout=12)
+
+
+class CacheWarmer:
+    def __init__(self, editions_limit: int = 1000, idle_gap: float = IDLE_GAP, pace: float = PACE):
+        self.editions_limit = editions_limit
+        self.idle_gap = idle_gap
+        self.pace = pace
+        self._queue: List[Dict[str, str]] = []
+        self._seen: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "idle"
+        self.stats = {"books": 0, "visited": 0, "requests": 0, "already_warm": 0, "missing": 0, "errors": 0}
+        self.last_error = ""
+
+    # ---------------------------
+    # Control
+    # ---------------------------
+
+    def add_books(self, books: Iterable[Dict[str, Any]]) -> int:
+        """Queue books (by openlibrary_id / isbn) not queued before; returns how many were added."""
+        added = 0
+        with self._lock:
+            for b in books:
+                olid = str(b.get("openlibrary_id") or "").strip().rsplit("/", 1)[-1]
+                isbn = olm.normalize_isbn(b.get("isbn"))
+                cover = str(b.get("cover_url") or "").strip()
+                key = (olid, isbn)
+                if key in self._seen or not (olid or isbn):
+                    continue
+                self._seen.add(key)
+                self._queue.append({"olid": olid, "isbn": isbn, "cover_url": cover})
+                added += 1
+            self.stats["books"] += added
+        return added
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ol-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.state = "stopped"
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "queued": len(self._queue), **self.stats, "last_error": self.last_error}
+
+    # ---------------------------
+    # Worker
+    # ---------------------------
+
+    def _yield_to_foreground(self) -> bool:
+        """Block while interactive traffic is active; False if we were asked to stop."""
+        while not self._stop.is_set():
+            idle = olm.foreground_idle_for()
+            if idle >= self.idle_gap:
+                return True
+            self.state = "yielding"
+            self._stop.wait(self.idle_gap - idle + 0.1)
+        return False
+
+    def _get(self, url: str) -> Optional[Dict[str, Any]]:
+        if url in RESPONSE_CACHE:
+            self.stats["already_warm"] += 1
+            return RESPONSE_CACHE.get(url)
+        if NEGATIVE_CACHE.get(url) or not self._yield_to_foreground():
+            return None
+        self.state = "running"
+        payload, meta = scheduler.call("openlibrary", _background_get, url, priority=scheduler.BACKGROUND)
+        if meta.get("status") is not None and not meta.get("negative_cached") and meta.get("source") not in ("cache", "catalog"):
+            self.stats["requests"] += 1
+            self._stop.wait(self.pace)
+        if payload is None:
+            self.stats["missing"] += 1
+        return payload
+
+    def _check_cover(self, url: str) -> None:
+        """HEAD an OpenLibrary cover with ?default=false; a 404 is negative-cached so nobody downloads it."""
+        if "covers.openlibrary.org" not in url or NEGATIVE_CACHE.get(url) or not self._yield_to_foreground():
+            return
+        breaker = breaker_for(url)
+        if not breaker.allow():
+            return
+        try:
+            sep = "&" if "?" in url else "?"
+            r = scheduler.call(
+                "openlibrary", requests.head, f"{url}{sep}default=false",
+                timeout=8, allow_redirects=True, priority=scheduler.BACKGROUND,
+            )
+        except Exception as e:
+            # Anything that isn't an answer must reach the breaker, or a half-open probe never ends
+            breaker.record_failure(str(e) or type(e).__name__)
+        else:
+            self.stats["requests"] += 1
+            if is_failure_status(r.status_code):
+                breaker.record_failure(f"HTTP {r.status_code}")
+            else:
+                breaker.record_success()
+                if r.status_code == 404:
+                    NEGATIVE_CACHE.add(url, status=404, reason="no cover")
+        self._stop.wait(self.pace)
+
+    def _warm_work(self, work_id: str) -> None:
+        wk = self._get(f"{olm.OL_BASE}/works/{work_id}.json")
+        # First page only: it is what the edition picker asks for first (cached with EDITION_FIELDS only)
+        self._get(olm.editions_page_url(work_id, self.editions_limit, 0))
+        for a in (wk or {}).get("authors", []) or []:
+            key = ((a or {}).get("author") or {}).get("key") or (a or {}).get("key")
+            if key and not self._stop.is_set():
+                self._get(f"{olm.OL_BASE}{key}.json")
+
+    def _warm_item(self, item: Dict[str, str]) -> None:
+        olid, isbn = item["olid"], item["isbn"]
+        work_id = olid if olid.endswith("W") else ""
+        if olid.endswith("M"):
+            ed = self._get(f"{olm.OL_BASE}/books/{olid}.json")
+            _, wk = olm._edition_links(ed or {})
+            work_id = (wk or "").rsplit("/", 1)[-1]
+        if isbn:
+            ed = self._get(olm._isbn_url(isbn))
+            if ed:
+                author_keys, wk = olm._edition_links(ed)
+                for key in author_keys:
+                    self._get(f"{olm.OL_BASE}{key}.json")
+                work_id = work_id or (wk or "").rsplit("/", 1)[-1]
+        if work_id:
+            self._warm_work(work_id)
+        if item["cover_url"]:
+            self._check_cover(item["cover_url"])
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                item = self._queue.pop(0) if self._queue else None
+            if item is None:
+                self.state = "done"
+                return
+            try:
+                self._warm_item(item)
+            except Exception as e:
+                # Reported through snapshot() (the sidebar), like the breakers; never printed from the thread
+                self.stats["errors"] += 1
+                self.last_error = f"{item['olid'] or item['isbn']}: {e}"
+            self.stats["visited"] += 1
@@ -5,39 +5,212 @@ from __future__ import annotations
 import requests
 import re
 import json
-from typing import Dict, Any, List, Optional, Tuple
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from http_guard import (
+    EMPTY_RESULT_TTL, NEGATIVE_CACHE, RESPONSE_CACHE, breaker_for, is_failure_status,
+)
+import ol_catalog
+from ol_dates import ol_year
 
 OL_BASE = "https://openlibrary.org"
 COVER_BASE = "https://covers.openlibrary.org/b"
 
+# search.json returns dozens of fields per doc (ia ids, lending, subjects...); ask only for what we read
+SEARCH_FIELDS = "key,title,title_suggest,author_name,first_publish_year,edition_count,cover_i,language"
+# editions.json has no projection parameter; entries are cut down to these before they are cached
+EDITION_FIELDS = ("key", "title", "publish_date", "number_of_pages", "pagination", "publishers", "publisher",
+                  "languages", "isbn_13", "isbn13", "isbn_10", "isbn10", "identifiers", "covers", "authors")
+
 # ---------------------------
 # Utilities
 # ---------------------------
 
-def _http_get_json(url: str, timeout: int = 12) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
-    """GET a URL and return (json_or_none, meta) where meta has url/status/raw_text on failure."""
+# ---------------------------
+# Foreground vs background traffic
+# ---------------------------
+
+# Background jobs (ol_warmer) run their requests inside background_requests() and back off
+# while any foreground (interactive) request is on the wire or happened very recently.
+_TRAFFIC = threading.local()
+_FG_LOCK = threading.Lock()
+_fg_inflight = 0
+_fg_last = 0.0
+
+@contextmanager
+def background_requests():
+    prev = getattr(_TRAFFIC, "background", False)
+    _TRAFFIC.background = True
+    try:
+        yield
+    finally:
+        _TRAFFIC.background = prev
+
+@contextmanager
+def _track_foreground():
+    global _fg_inflight, _fg_last
+    if getattr(_TRAFFIC, "background", False):
+        yield
+        return
+    with _FG_LOCK:
+        _fg_inflight += 1
+    try:
+        yield
+    finally:
+        with _FG_LOCK:
+            _fg_inflight -= 1
+            _fg_last = time.monotonic()
+
+def foreground_idle_for() -> float:
+    """Seconds since the last interactive OpenLibrary request finished (0 while one is running)."""
+    with _FG_LOCK:
+        return 0.0 if _fg_inflight else time.monotonic() - _fg_last
+
+def _project(url: str, payload: Any) -> Any:
+    """Payload as cached: editions.json pages keep only EDITION_FIELDS of each entry."""
+    if isinstance(payload, dict) and "/editions.json" in url and isinstance(payload.get("entries"), list):
+        entries = [{k: e[k] for k in EDITION_FIELDS if k in e} if isinstance(e, dict) else e for e in payload["entries"]]
+        return {**payload, "entries": entries}
+    return payload
+
+def _local_json(url: str, keep_raw: bool = False) -> Optional[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    (json_or_none, meta) when url is answered without the network: offline catalog, response cache
+    or negative cache. None means a real request is needed (bulk clients throttle only those).
+    """
+    meta = {"url": url, "status": None, "raw": None}
+    # Offline catalog (ol_dump_import.py) answers first when it has the record
+    if ol_catalog.catalog_available():
+        local = ol_catalog.answer(url)
+        if local is not None or ol_catalog.CATALOG_ONLY:
+            meta.update(status=200 if local is not None else 404, raw=local if keep_raw else None, source="catalog")
+            return local, meta
+    cached = RESPONSE_CACHE.get(url)
+    if cached is not None:
+        meta.update(status=200, raw=cached if keep_raw else None, source="cache")
+        return cached, meta
+    neg = NEGATIVE_CACHE.get(url)
+    if neg:
+        meta.update(status=neg["status"], negative_cached=True)
+        meta["raw"] = {"error": f"cached miss ({neg['reason'] or neg['status']})"}
+        return None, meta
+    return None
+
+def _http_get_json(url: str, timeout: int = 12, keep_raw: bool = False) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    GET a URL and return (json_or_none, meta) where meta has url/status/raw_text on failure.
+    URLs the local OpenLibrary catalog can answer never reach the network (meta['source'] == 'catalog').
+    The parsed payload is only kept in meta['raw'] when keep_raw (debug) is set.
+    Successful payloads are cached (RESPONSE_CACHE, shared by all sessions and the background
+    warmer); known-missing URLs are answered from the negative cache, and an open circuit breaker for
+    the endpoint fails fast instead of waiting out the timeout (meta says which happened).
+    """
+    local = _local_json(url, keep_raw=keep_raw)
+    if local is not None:
+        return local
     meta = {"url": url, "status": None, "raw": None}
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        meta["circuit_open"] = True
+        meta["raw"] = {"error": f"circuit open for {breaker.name}"}
+        return None, meta
+
+    try:
+        with _track_foreground():
+            r = requests.get(url, timeout=timeout)
+    except Exception as e:
+        breaker.record_failure(str(e))
+        meta["raw"] = {"error": str(e)}
+        return None, meta
+
+    meta["status"] = r.status_code
+    if is_failure_status(r.status_code):
+        breaker.record_failure(f"HTTP {r.status_code}")
+    else:
+        breaker.record_success()
+    if r.status_code == 404:
+        NEGATIVE_CACHE.add(url, status=404, reason="not found")
+
     try:
-        r = requests.get(url, timeout=timeout)
-        meta["status"] = r.status_code
         ctype = r.headers.get("content-type", "")
         if r.ok and "json" in ctype:
             payload = r.json()
-            meta["raw"] = payload
+            meta["raw"] = payload if keep_raw else None
+            payload = _project(url, payload)
+            RESPONSE_CACHE.put(url, payload)
             return payload, meta
         else:
-            # Try parse anyway; if fails, keep raw text for debugging
+            # Try parse anyway; if fails, keep (the start of) the raw text for debugging
             try:
                 payload = r.json()
-                meta["raw"] = payload
+                meta["raw"] = payload if keep_raw else None
                 return payload, meta
             except Exception:
-                meta["raw"] = r.text
+                meta["raw"] = r.text if keep_raw else r.text[:500]
                 return None, meta
     except Exception as e:
         meta["raw"] = {"error": str(e)}
         return None, meta
 
+class OpenLibraryError(RuntimeError):
+    """Raised by fetch_json when OpenLibrary gives no usable JSON (HTTP error, cached miss, open circuit)."""
+
+def fetch_json(url: str, timeout: int = 12) -> Dict[str, Any]:
+    """Guarded GET for callers that want exceptions instead of (payload, meta) tuples."""
+    payload, meta = _shared_get_json(url, timeout=timeout)
+    status = meta.get("status")
+    if not isinstance(payload, dict) or (status is not None and status >= 400):
+        raw = meta.get("raw")
+        detail = raw.get("error") if isinstance(raw, dict) and raw.get("error") else f"HTTP {status}"
+        raise OpenLibraryError(f"{detail} ({url})")
+    return payload
+
+# Sub-requests (authors, work) for edition hydration run on this pool.
+_HYDRATE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ol-hydrate")
+
+# url -> Future for GETs currently on the wire, so concurrent callers share one request
+_INFLIGHT: Dict[str, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+def _shared_get_json(url: str, timeout: int = 12, keep_raw: bool = False) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Like _http_get_json, but deduplicates in-flight requests: if another thread (or session)
+    is already fetching `url`, wait for its result instead of issuing a second GET.
+    meta gains 'elapsed_ms' (wall time seen by this caller) and 'shared' (True if we piggybacked).
+    """
+    t0 = time.perf_counter()
+    with _INFLIGHT_LOCK:
+        fut = _INFLIGHT.get(url)
+        owner = fut is None
+        if owner:
+            fut = Future()
+            _INFLIGHT[url] = fut
+
+    if owner:
+        try:
+            # Keep the payload for waiters that want raw; it's the same object, so this is free
+            payload, meta = _http_get_json(url, timeout=timeout, keep_raw=True)
+            fut.set_result((payload, meta))
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with _INFLIGHT_LOCK:
+                _INFLIGHT.pop(url, None)
+    else:
+        payload, meta = fut.result()
+
+    meta = dict(meta)
+    if not keep_raw and payload is not None:
+        meta["raw"] = None
+    meta["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    meta["shared"] = not owner
+    return payload, meta
+
 def _extract_languages(ed: Dict[str, Any]) -> List[str]:
     langs = set()
     # editions often: {"languages":[{"key":"/languages/eng"}]}
@@ -82,10 +255,7 @@ def _first_isbn(ed: Dict[str, Any]) -> Optional[str]:
     return None
 
 def _to_int_year(text: Any) -> Optional[int]:
-    if not text:
-        return None
-    m = re.search(r"(18|19|20)\d{2}", str(text))
-    return int(m.group(0)) if m else None
+    return ol_year(text)
 
 def _author_str(doc: Dict[str, Any]) -> str:
     # Search API: 'author_name' is a list
@@ -114,6 +284,17 @@ def search_works(
     Results are normalized dicts:
       {work_key, title, author, first_publish_year, edition_count, cover_url, score}
     """
+    url = _search_url(title=title, author=author, year=year, limit=limit)
+    payload, meta = _http_get_json(url, timeout=timeout, keep_raw=debug)
+
+    docs = (payload or {}).get("docs", []) if isinstance(payload, dict) else []
+    if payload is not None and not docs and meta.get("status") == 200:
+        NEGATIVE_CACHE.add(url, status=200, reason="no results", ttl=EMPTY_RESULT_TTL)
+    out = _normalize_search_docs(docs, prefer_lang=prefer_lang, limit=limit)
+    return (out, meta if debug else None)
+
+def _search_url(title: Optional[str] = None, author: Optional[str] = None,
+                year: Optional[int] = None, limit: int = 10) -> str:
     params = []
     if title:  params.append(("title", title))
     if author: params.append(("author", author))
@@ -124,12 +305,13 @@ def search_works(
 
     # Add a language hint to search
     params.append(("language", "eng"))
+    params.append(("fields", SEARCH_FIELDS))
 
     qstr = "&".join([f"{k}={requests.utils.quote(v)}" for k, v in params])
-    url = f"{OL_BASE}/search.json?{qstr}"
-    payload, meta = _http_get_json(url, timeout=timeout)
+    return f"{OL_BASE}/search.json?{qstr}"
 
-    docs = (payload or {}).get("docs", []) if isinstance(payload, dict) else []
+def _normalize_search_docs(docs: List[Dict[str, Any]], prefer_lang: Tuple[str, ...] = ("eng", "en"),
+                           limit: int = 10) -> List[Dict[str, Any]]:
     normalized = []
     for d in docs:
         langs = d.get("language") or []  # e.g. ["eng","spa"]
@@ -157,13 +339,16 @@ def search_works(
     ), reverse=True)
 
     # Trim to limit
-    out = normalized[:limit]
-    return (out, meta if debug else None)
+    return normalized[:limit]
 
 # ---------------------------
 # Editions for a work
 # ---------------------------
 
+def editions_page_url(work_id: str, limit: int, offset: int = 0) -> str:
+    """editions.json page URL for a bare work id ('OL123W'); shared so caches line up across callers."""
+    return f"{OL_BASE}/works/{work_id}/editions.json?limit={limit}&offset={offset}"
+
 def fetch_editions_for_work(work_olid: str, limit: int = 50, timeout: int = 12, debug: bool = False):
     """
     Returns:
@@ -171,42 +356,38 @@ def fetch_editions_for_work(work_olid: str, limit: int = 50, timeout: int = 12,
       - when debug=True: (LIST[dict], meta)
     Each edition dict should include keys app.py expects: cover_url, title, publisher, publish_date, pages, isbn, language, ol_edition_id
     """
-    import requests
-
-    url = f"https://openlibrary.org{work_olid}/editions.json?limit={limit}"
-    meta = {"url": url, "status": None, "raw": None}
-
-    try:
-        resp = requests.get(url, timeout=timeout)
-        meta["status"] = resp.status_code
-        meta["raw"] = resp.text
-        resp.raise_for_status()
-        data = resp.json() or {}
-        docs = data.get("entries") or data.get("editions") or data.get("docs") or []
-
-        editions = []
-        for d in docs:
-            # normalize a few common fields
-            cover_id = d.get("covers", [None])[0] if isinstance(d.get("covers"), list) else d.get("covers")
-            cover_url = f"https://covers.openlibrary.org/b/id/{cover_id}-M.jpg" if cover_id else ""
-            editions.append({
-                "title": d.get("title", ""),
-                "publisher": ", ".join(d.get("publishers", [])) if isinstance(d.get("publishers"), list) else (d.get("publisher") or ""),
-                "publish_date": d.get("publish_date", ""),
-                "pages": d.get("number_of_pages") or d.get("pagination") or "",
-                "isbn": (d.get("isbn_13", []) or d.get("isbn_10", []) or [""])[0] if isinstance(d.get("isbn_13", []), list) else d.get("isbn_13") or "",
-                "language": (d.get("languages", [{}])[0].get("key", "").split("/")[-1] if d.get("languages") else ""),
-                "ol_edition_id": d.get("key", ""),  # e.g. "/books/OL12345M"
-                "cover_url": cover_url,
-            })
-
-    except Exception as exc:
-        # On network/parse error, return empty list (and meta if debug)
-        editions = []
-        meta["error"] = str(exc)
+    url = f"{OL_BASE}{work_olid}/editions.json?limit={limit}"
+    data, meta = _http_get_json(url, timeout=timeout, keep_raw=debug)
+    editions = []
+
+    if data is None:
+        # On network/parse error (or open circuit / cached miss), return empty list (and meta if debug)
+        raw = meta.get("raw")
+        meta["error"] = raw.get("error") if isinstance(raw, dict) and raw.get("error") else f"HTTP {meta.get('status')}"
+    else:
+        editions = _normalize_edition_entries(data)
 
     return (editions, meta) if debug else editions
 
+def _normalize_edition_entries(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    docs = data.get("entries") or data.get("editions") or data.get("docs") or []
+    editions = []
+    for d in docs:
+        # normalize a few common fields
+        cover_id = d.get("covers", [None])[0] if isinstance(d.get("covers"), list) else d.get("covers")
+        cover_url = f"https://covers.openlibrary.org/b/id/{cover_id}-M.jpg" if cover_id else ""
+        editions.append({
+            "title": d.get("title", ""),
+            "publisher": ", ".join(d.get("publishers", [])) if isinstance(d.get("publishers"), list) else (d.get("publisher") or ""),
+            "publish_date": d.get("publish_date", ""),
+            "pages": d.get("number_of_pages") or d.get("pagination") or "",
+            "isbn": (d.get("isbn_13", []) or d.get("isbn_10", []) or [""])[0] if isinstance(d.get("isbn_13", []), list) else d.get("isbn_13") or "",
+            "language": (d.get("languages", [{}])[0].get("key", "").split("/")[-1] if d.get("languages") else ""),
+            "ol_edition_id": d.get("key", ""),  # e.g. "/books/OL12345M"
+            "cover_url": cover_url,
+        })
+    return editions
+
 
 # ---------------------------
 # Detailed metadata for a single item
@@ -235,11 +416,11 @@ def fetch_detailed_metadata(
 
     # 1) ISBN → edition
     if isbn:
-        url = f"{OL_BASE}/isbn/{isbn}.json"
-        ed, m = _http_get_json(url, timeout=timeout)
+        url = _isbn_url(isbn)
+        ed, m = _shared_get_json(url, timeout=timeout, keep_raw=debug)
         step("isbn_lookup", m)
         if ed:
-            data, m2 = _hydrate_from_edition_json(ed, timeout=timeout)
+            data, m2 = _hydrate_from_edition_json(ed, timeout=timeout, debug=debug)
             step("edition_hydrate", m2)
             return (data, meta_bundle if debug else None)
 
@@ -247,10 +428,10 @@ def fetch_detailed_metadata(
     if edition_olid:
         eo = edition_olid.replace("/books/", "").strip()
         url = f"{OL_BASE}/books/{eo}.json"
-        ed, m = _http_get_json(url, timeout=timeout)
+        ed, m = _shared_get_json(url, timeout=timeout, keep_raw=debug)
         step("edition_lookup", m)
         if ed:
-            data, m2 = _hydrate_from_edition_json(ed, timeout=timeout)
+            data, m2 = _hydrate_from_edition_json(ed, timeout=timeout, debug=debug)
             step("edition_hydrate", m2)
             return (data, meta_bundle if debug else None)
 
@@ -258,30 +439,54 @@ def fetch_detailed_metadata(
     if work_olid:
         wo = work_olid.replace("/works/", "").strip()
         url = f"{OL_BASE}/works/{wo}.json"
-        wk, m = _http_get_json(url, timeout=timeout)
+        wk, m = _shared_get_json(url, timeout=timeout, keep_raw=debug)
         step("work_lookup", m)
         if wk:
-            data = {
-                "title": wk.get("title"),
-                "description": _extract_description(wk.get("description")),
-                "subjects": wk.get("subjects", []),
-                "work_key": f"/works/{wo}",
-                "covers": _covers_from_work(wk),
-            }
+            data = _work_data(wk, f"/works/{wo}")
             return (data, meta_bundle if debug else None)
 
     # Fallback empty
     return ({}, meta_bundle if debug else None)
 
-def _hydrate_from_edition_json(ed_json: Dict[str, Any], timeout: int = 12) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+def _hydrate_from_edition_json(ed_json: Dict[str, Any], timeout: int = 12, debug: bool = False) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
     Build a rich dict from an edition JSON; fetches author names and work info when available.
     Returns (data, meta) where meta aggregates each sub-request.
     """
+    t0 = time.perf_counter()
     meta = {"subcalls": []}
     def note(label, m): meta["subcalls"].append({label: m})
 
-    data = {
+    data = _edition_data(ed_json)
+    author_keys, work_key = _edition_links(ed_json)
+
+    # Authors and work are independent lookups: issue them all at once
+    author_futs = [
+        _HYDRATE_POOL.submit(_shared_get_json, f"{OL_BASE}{key}.json", timeout, debug)
+        for key in author_keys
+    ]
+    # Work (to fill description/subjects/covers if edition sparse)
+    work_fut = _HYDRATE_POOL.submit(_shared_get_json, f"{OL_BASE}{work_key}.json", timeout, debug) if work_key else None
+
+    author_names = []
+    for fut in author_futs:
+        aj, m = fut.result()
+        note("author", m)
+        if aj and aj.get("name"):
+            author_names.append(aj["name"])
+    data["authors"] = author_names or None
+
+    if work_fut:
+        wk, m = work_fut.result()
+        note("work", m)
+        if wk:
+            _apply_work(data, wk)
+
+    meta["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return data, meta
+
+def _edition_data(ed_json: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "title": ed_json.get("title"),
         "subtitle": ed_json.get("subtitle"),
         "publish_date": ed_json.get("publish_date"),
@@ -295,35 +500,30 @@ def _hydrate_from_edition_json(ed_json: Dict[str, Any], timeout: int = 12) -> Tu
         "description": _extract_description(ed_json.get("description")),
     }
 
-    # Authors
-    author_names = []
-    for a in ed_json.get("authors", []):
-        key = (a or {}).get("key")  # e.g. "/authors/OL123A"
-        if key:
-            url = f"{OL_BASE}{key}.json"
-            aj, m = _http_get_json(url, timeout=timeout)
-            note("author", m)
-            if aj and aj.get("name"):
-                author_names.append(aj["name"])
-    data["authors"] = author_names or None
-
-    # Work (to fill description/subjects/covers if edition sparse)
-    work_key = None
+def _edition_links(ed_json: Dict[str, Any]) -> Tuple[List[str], Optional[str]]:
+    """(author keys like '/authors/OL123A', first work key or None) referenced by an edition."""
+    author_keys = [(a or {}).get("key") for a in ed_json.get("authors", [])]
     works = ed_json.get("works") or []
-    if works:
-        work_key = (works[0] or {}).get("key")
-    if work_key:
-        url = f"{OL_BASE}{work_key}.json"
-        wk, m = _http_get_json(url, timeout=timeout)
-        note("work", m)
-        if wk:
-            data.setdefault("description", _extract_description(wk.get("description")))
-            if not data.get("covers"):
-                data["covers"] = _covers_from_work(wk)
-            if not data.get("subjects"):
-                data["subjects"] = wk.get("subjects", [])
-
-    return data, meta
+    work_key = (works[0] or {}).get("key") if works else None
+    return [k for k in author_keys if k], work_key
+
+def _apply_work(data: Dict[str, Any], wk: Dict[str, Any]) -> None:
+    """Fill description/covers/subjects the edition lacked from its work JSON."""
+    if not data.get("description"):
+        data["description"] = _extract_description(wk.get("description"))
+    if not data.get("covers"):
+        data["covers"] = _covers_from_work(wk)
+    if not data.get("subjects"):
+        data["subjects"] = wk.get("subjects", [])
+
+def _work_data(wk: Dict[str, Any], work_key: str) -> Dict[str, Any]:
+    return {
+        "title": wk.get("title"),
+        "description": _extract_description(wk.get("description")),
+        "subjects": wk.get("subjects", []),
+        "work_key": work_key,
+        "covers": _covers_from_work(wk),
+    }
 
 def _extract_description(desc_field: Any) -> Optional[str]:
     # description may be str or {"value": "..."}
@@ -354,6 +554,102 @@ def _covers_from_work(wk_json: Dict[str, Any]) -> List[str]:
             out.append(f"{COVER_BASE}/id/{bid}-L.jpg")
     return out
 
+# ---------------------------
+# Batched ISBN resolution (bibkeys API)
+# ---------------------------
+
+# Keep each /api/books URL comfortably under common proxy/server URL limits.
+BIBKEYS_MAX_URL = 1800
+BIBKEYS_MAX_PER_CHUNK = 100
+
+def normalize_isbn(raw: Any) -> str:
+    """'0-451-16951-4, 978...' -> '0451169514' (first value, digits/X only)."""
+    first = str(raw or "").split(",")[0]
+    return re.sub(r"[^0-9Xx]", "", first).upper()
+
+def _isbn_url(isbn: str) -> str:
+    return f"{OL_BASE}/isbn/{isbn}.json"
+
+def _bibkeys_url(isbns: List[str]) -> str:
+    keys = ",".join(f"ISBN:{i}" for i in isbns)
+    return f"{OL_BASE}/api/books?bibkeys={keys}&format=json&jscmd=details"
+
+def _chunk_isbns(isbns: List[str]) -> List[List[str]]:
+    chunks, cur = [], []
+    for isbn in isbns:
+        if cur and (len(cur) >= BIBKEYS_MAX_PER_CHUNK or len(_bibkeys_url(cur + [isbn])) > BIBKEYS_MAX_URL):
+            chunks.append(cur)
+            cur = []
+        cur.append(isbn)
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+def _parse_bibkeys_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    details = entry.get("details") or {}
+    works = details.get("works") or []
+    covers = _covers_from_edition(details)
+    thumb = entry.get("thumbnail_url") or ""
+    return {
+        "edition_key": details.get("key"),                        # "/books/OL...M"
+        "work_key": (works[0] or {}).get("key") if works else None,  # "/works/OL...W"
+        "title": details.get("title"),
+        "pages": details.get("number_of_pages"),
+        "publish_date": details.get("publish_date"),
+        "cover_url": covers[0] if covers else thumb.replace("-S.jpg", "-L.jpg"),
+        "info_url": entry.get("info_url"),
+    }
+
+def _isbns_to_resolve(isbns: Iterable[Any]) -> List[str]:
+    """Normalized, de-duplicated ISBNs, minus those recently confirmed missing (here or via /isbn/{isbn}.json)."""
+    wanted = dict.fromkeys(n for n in (normalize_isbn(i) for i in isbns) if n)
+    return [i for i in wanted if not NEGATIVE_CACHE.get(_isbn_url(i))]
+
+def _bibkeys_entries(chunk: List[str], payload: Any, status: Optional[int]) -> Dict[str, Dict[str, Any]]:
+    """{isbn: bibkeys entry} from one chunk's answer; ISBNs a successful answer lacks are negative-cached."""
+    out: Dict[str, Dict[str, Any]] = {}
+    if not isinstance(payload, dict):
+        return out
+    for isbn in chunk:
+        entry = payload.get(f"ISBN:{isbn}")
+        if isinstance(entry, dict):
+            out[isbn] = entry
+        elif status == 200:
+            NEGATIVE_CACHE.add(_isbn_url(isbn), status=404, reason="unknown ISBN (bibkeys)")
+    return out
+
+def resolve_isbns(
+    isbns: List[Any],
+    max_workers: int = 4,
+    timeout: int = 20,
+    debug: bool = False,
+) -> Tuple[Dict[str, Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Resolve many ISBNs with as few requests as possible.
+    ISBNs are packed into /api/books?bibkeys=ISBN:a,ISBN:b,... (chunked to URL limits) and the
+    chunks are fetched concurrently. Returns ({isbn: {edition_key, work_key, title, pages,
+    publish_date, cover_url, info_url}}, meta_if_debug). ISBNs OpenLibrary doesn't know are
+    simply absent from the mapping; keys are normalized ISBNs (see normalize_isbn).
+    """
+    wanted = _isbns_to_resolve(isbns)
+    chunks = _chunk_isbns(wanted)
+    meta_bundle = {"requests": len(chunks), "isbns": len(wanted), "chunks": []}
+    out: Dict[str, Dict[str, Any]] = {}
+    if not chunks:
+        return (out, meta_bundle if debug else None)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))),
+                            thread_name_prefix="ol-bibkeys") as pool:
+        futs = [pool.submit(_shared_get_json, _bibkeys_url(c), timeout) for c in chunks]
+        for chunk, fut in zip(chunks, futs):
+            payload, m = fut.result()
+            meta_bundle["chunks"].append({"size": len(chunk), "status": m.get("status"),
+                                          "elapsed_ms": m.get("elapsed_ms")})
+            for isbn, entry in _bibkeys_entries(chunk, payload, m.get("status")).items():
+                out[isbn] = _parse_bibkeys_entry(entry)
+
+    return (out, meta_bundle if debug else None)
+
 # ---------------------------
 # Thin wrappers used by app.py
 # ---------------------------
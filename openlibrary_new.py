@@ -1,24 +1,19 @@
 # openlibrary_new.py
 import requests
 import time
-from datetime import datetime
 from operator import itemgetter
+from ol_dates import ol_date, ol_date_key
 
-DATE_FORMATS = ['%Y', '%b %d, %Y', '%B %d, %Y', '%Y-%m-%d', '%m/%d/%Y', '%B %Y', '%b %Y']
 COVER_SIZE = "M"
 MAX_LIMIT = 1000
 SLEEP_TIME = 0.3
 OUTPUT_LIMIT = 10
+SEARCH_FIELDS = "key,title,author_name,first_publish_year,cover_i"
+EDITION_FIELDS = ("key", "title", "publish_date", "publishers", "number_of_pages", "pagination",
+                  "isbn_13", "isbn_10", "authors", "languages")
 
 def parse_ol_date(date_str):
-    if not date_str:
-        return datetime(1, 1, 1)
-    for fmt in DATE_FORMATS:
-        try:
-            return datetime.strptime(date_str.strip(), fmt)
-        except ValueError:
-            continue
-    return datetime(9999, 12, 31)
+    return ol_date(date_str)
 
 def get_cover_url(edition_key, size=COVER_SIZE):
     if not edition_key:
@@ -38,7 +33,10 @@ def fetch_author_name(author_key):
 
 def search_works(query):
     """Return up to 10 works from the OpenLibrary search endpoint."""
-    url = f"https://openlibrary.org/search.json?q={requests.utils.quote(query)}"
+    url = (
+        f"https://openlibrary.org/search.json?q={requests.utils.quote(query)}"
+        f"&limit=10&fields={SEARCH_FIELDS}"
+    )
     r = requests.get(url, timeout=10)
     r.raise_for_status()
     data = r.json()
@@ -66,7 +64,7 @@ def fetch_editions_for_work(work_id):
         entries = data.get("entries", [])
         if not entries:
             break
-        all_editions.extend(entries)
+        all_editions.extend({k: e[k] for k in EDITION_FIELDS if k in e} for e in entries)
         total = data.get("size", 0)
         offset += len(entries)
         time.sleep(SLEEP_TIME)
@@ -76,7 +74,7 @@ def fetch_editions_for_work(work_id):
     for ed in all_editions:
         langs = ed.get("languages")
         if langs is None or english_key in langs:
-            ed["_sort_date"] = parse_ol_date(ed.get("publish_date"))
+            ed["_sort_date"] = ol_date_key(ed.get("publish_date"))
             filtered.append(ed)
 
     sorted_ed = sorted(filtered, key=itemgetter("_sort_date"))[:OUTPUT_LIMIT]
@@ -0,0 +1,273 @@
+# scheduler.py
+# Priority scheduler for external calls (OpenLibrary, Google Sheets/Drive, Anthropic).
+#
+# Each upstream gets a small bounded worker pool and its own rate limit. Work comes in two classes:
+#   INTERACTIVE — search, save, enrich one book; always taken first, and one worker per upstream
+#                 is kept free of background work so a click never waits behind a backfill.
+#   BACKGROUND  — backfills, warmers, sync; grouped into Jobs with progress and cancellation.
+#
+# Example:
+#   results = call("openlibrary", fetch_json, url, timeout=15)              # interactive, blocking
+#   (timeout= is fetch_json's; call(..., wait_timeout=30) bounds the wait for the result)
+#   job = start_job("backfill", "openlibrary", lookup_one, isbns)            # background
+#   job.snapshot() → {"done": 12, "total": 300, ...};  job.cancel()
+
+from __future__ import annotations
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    # Tasks run with the submitting Streamlit session's context so st.session_state / st.secrets work
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    from streamlit.runtime.scriptrunner.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+except ImportError:
+    get_script_run_ctx = None
+    SCRIPT_RUN_CONTEXT_ATTR_NAME = None
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# upstream -> pool size and max request starts per second
+UPSTREAMS: Dict[str, Dict[str, float]] = {
+    "openlibrary": {"workers": 4, "rate": 5.0},
+    "google": {"workers": 2, "rate": 2.0},      # Sheets allows ~60 requests/min per user
+    "anthropic": {"workers": 2, "rate": 1.0},
+}
+
+
+class _Task:
+    __slots__ = ("fn", "args", "kwargs", "priority", "future", "job", "ctx")
+
+    def __init__(self, fn, args, kwargs, priority, job):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.priority = priority
+        self.future: Future = Future()
+        self.job = job
+        self.ctx = get_script_run_ctx() if get_script_run_ctx else None
+
+
+class Job:
+    """A batch of background tasks with progress reporting and cancellation."""
+
+    def __init__(self, name: str, upstream: str, total: int = 0):
+        self.name = name
+        self.upstream = upstream
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._futures: List[Future] = []
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Drop every task not yet started; tasks already running finish normally."""
+        self._cancelled.set()
+        for f in list(self._futures):
+            f.cancel()
+
+    def _track(self, fut: Future) -> None:
+        with self._lock:
+            self._futures.append(fut)
+        fut.add_done_callback(self._on_done)
+
+    def _on_done(self, fut: Future) -> None:
+        with self._lock:
+            if fut.cancelled():
+                pass
+            elif fut.exception() is not None:
+                self.failed += 1
+            else:
+                self.done += 1
+            if all(f.done() for f in self._futures):
+                self.finished_at = time.time()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every task has finished or been cancelled; False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        for f in list(self._futures):
+            if f.cancelled():
+                continue
+            try:
+                f.exception(timeout=None if deadline is None else max(0.0, deadline - time.time()))
+            except TimeoutError:
+                return False
+            except Exception:
+                pass
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            running = self.finished_at is None and not self.cancelled
+            return {
+                "job": self.name,
+                "upstream": self.upstream,
+                "done": self.done,
+                "failed": self.failed,
+                "total": self.total,
+                "state": "cancelled" if self.cancelled else ("running" if running else "finished"),
+                "elapsed_s": round((self.finished_at or time.time()) - self.started_at, 1),
+            }
+
+
+class _UpstreamPool:
+    def __init__(self, name: str, workers: int, rate: float):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.background_slots = max(1, self.workers - 1)
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._next_start = 0.0
+        self._bg_running = 0
+        self._threads: List[threading.Thread] = []
+        self.stats = {"interactive": 0, "background": 0, "cancelled": 0, "errors": 0}
+
+    def submit(self, task: _Task) -> Future:
+        with self._cond:
+            if not self._threads:
+                for i in range(self.workers):
+                    t = threading.Thread(target=self._worker, name=f"sched-{self.name}-{i}", daemon=True)
+                    t.start()
+                    self._threads.append(t)
+            heapq.heappush(self._heap, (task.priority, next(self._seq), task))
+            self._cond.notify()
+        return task.future
+
+    def _next_task(self) -> _Task:
+        with self._cond:
+            while True:
+                if self._heap:
+                    task = self._heap[0][2]
+                    if task.priority < BACKGROUND or self._bg_running < self.background_slots:
+                        heapq.heappop(self._heap)
+                        if task.priority >= BACKGROUND:
+                            self._bg_running += 1
+                        return task
+                self._cond.wait()
+
+    def _throttle(self) -> None:
+        if not self.interval:
+            return
+        with self._cond:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def _worker(self) -> None:
+        thread = threading.current_thread()
+        while True:
+            task = self._next_task()
+            background = task.priority >= BACKGROUND
+            try:
+                if not task.future.set_running_or_notify_cancel():
+                    self.stats["cancelled"] += 1
+                    continue
+                self._throttle()
+                self.stats["background" if background else "interactive"] += 1
+                if SCRIPT_RUN_CONTEXT_ATTR_NAME and task.ctx is not None:
+                    setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, task.ctx)
+                try:
+                    task.future.set_result(task.fn(*task.args, **task.kwargs))
+                except BaseException as e:
+                    self.stats["errors"] += 1
+                    task.future.set_exception(e)
+            finally:
+                if SCRIPT_RUN_CONTEXT_ATTR_NAME:
+                    setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+                if background:
+                    with self._cond:
+                        self._bg_running -= 1
+                        self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            queued_bg = sum(1 for p, _, _ in self._heap if p >= BACKGROUND)
+            return {
+                "queued_interactive": len(self._heap) - queued_bg,
+                "queued_background": queued_bg,
+                "background_running": self._bg_running,
+                **self.stats,
+            }
+
+
+class Scheduler:
+    def __init__(self, upstreams: Optional[Dict[str, Dict[str, float]]] = None):
+        self._config = dict(upstreams or UPSTREAMS)
+        self._pools: Dict[str, _UpstreamPool] = {}
+        self._jobs: List[Job] = []
+        self._lock = threading.Lock()
+
+    def _pool(self, upstream: str) -> _UpstreamPool:
+        with self._lock:
+            pool = self._pools.get(upstream)
+            if pool is None:
+                cfg = self._config.get(upstream, {"workers": 2, "rate": 0})
+                pool = self._pools[upstream] = _UpstreamPool(upstream, cfg["workers"], cfg["rate"])
+            return pool
+
+    def submit(self, upstream: str, fn: Callable, *args, priority: int = INTERACTIVE,
+               job: Optional[Job] = None, **kwargs) -> Future:
+        task = _Task(fn, args, kwargs, priority, job)
+        fut = self._pool(upstream).submit(task)
+        if job is not None:
+            job._track(fut)
+        return fut
+
+    def call(self, upstream: str, fn: Callable, *args, priority: int = INTERACTIVE,
+             wait_timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on the upstream's pool and wait for its result (exceptions propagate).
+        Every other keyword (timeout= included) goes to fn; wait_timeout bounds the wait itself.
+        """
+        return self.submit(upstream, fn, *args, priority=priority, **kwargs).result(timeout=wait_timeout)
+
+    def start_job(self, name: str, upstream: str, fn: Callable[[Any], Any], items: Iterable[Any],
+                  priority: int = BACKGROUND) -> Job:
+        """Queue fn(item) for every item as one background Job; returns immediately."""
+        items = list(items)
+        job = Job(name, upstream, total=len(items))
+        with self._lock:
+            self._jobs = [j for j in self._jobs if j.snapshot()["state"] == "running"] + [job]
+        for item in items:
+            if job.cancelled:
+                break
+            self.submit(upstream, fn, item, priority=priority, job=job)
+        return job
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            pools = {name: p.snapshot() for name, p in sorted(self._pools.items())}
+            jobs = [j.snapshot() for j in self._jobs]
+        return {"upstreams": pools, "jobs": jobs}
+
+
+# ---------------------------
+# Process-wide scheduler
+# ---------------------------
+
+SCHEDULER = Scheduler()
+
+def submit(upstream: str, fn: Callable, *args, **kwargs) -> Future:
+    return SCHEDULER.submit(upstream, fn, *args, **kwargs)
+
+def call(upstream: str, fn: Callable, *args, **kwargs) -> Any:
+    return SCHEDULER.call(upstream, fn, *args, **kwargs)
+
+def start_job(name: str, upstream: str, fn: Callable[[Any], Any], items: Iterable[Any], **kwargs) -> Job:
+    return SCHEDULER.start_job(name, upstream, fn, items, **kwargs)
+
+def status_snapshot() -> Dict[str, Any]:
+    return SCHEDULER.snapshot()
@@ -0,0 +1,160 @@
+# search_as_you_type.py
+# Incremental search with a shared query-result cache.
+#
+# Streamlit's text_input reports a change on Enter or blur, so every submit() is a deliberate search
+# and starts at once (no debounce, no minimum length: "It" and "Oz" are real titles). On top of that:
+#   - a newer submit() supersedes the older one; results of a superseded in-flight request are
+#     never shown (they are still cached).
+#   - cached results expire after `ttl` seconds, like the @st.cache_data(ttl=300) search they replace.
+#   - a query extending a cached one ("the stan" after "the sta") gets the cached results filtered
+#     locally as a provisional answer to show while its own search runs. OpenLibrary's search.json
+#     matches whole tokens, so "the sta" results are not a superset of "the stand" results; only a
+#     prefix-aware fetcher (PrefixCache(prefix_aware=True), e.g. the FTS catalog) may have a
+#     complete cached page answer an extension outright.
+
+from __future__ import annotations
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fuzzy_index import normalize
+
+# fetch(query) -> (results, num_found); results are dicts with at least title/author
+Fetcher = Callable[[str], Tuple[List[Dict[str, Any]], int]]
+
+_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="search-as-you-type")
+
+
+def matches(result: Dict[str, Any], query: str) -> bool:
+    """Every query word is a prefix of some word in the title/author (last word may be partial)."""
+    words = normalize(f"{result.get('title', '')} {result.get('author', '')}").split()
+    return all(any(w.startswith(tok) for w in words) for tok in normalize(query).split())
+
+
+class PrefixCache:
+    """Thread-safe query → (results, complete) cache shared by every session; entries live `ttl` seconds."""
+
+    def __init__(self, max_entries: int = 500, prefix_aware: bool = False, ttl: float = 300):
+        self.max_entries = max_entries
+        self.prefix_aware = prefix_aware  # the fetcher matches word prefixes, not just whole words
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[List[Dict[str, Any]], bool, float]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "prefix_hits": 0, "misses": 0}
+
+    def put(self, query: str, results: List[Dict[str, Any]], complete: bool) -> None:
+        with self._lock:
+            q = normalize(query)
+            self._entries.pop(q, None)  # re-insert at the end: eviction below drops the oldest entry
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[q] = (results, complete, time.monotonic() + self.ttl)
+
+    def _live(self, q: str) -> Optional[Tuple[List[Dict[str, Any]], bool, float]]:
+        """Unexpired entry for q (caller holds the lock); expired entries are dropped."""
+        entry = self._entries.get(q)
+        if entry is not None and entry[2] <= time.monotonic():
+            del self._entries[q]
+            return None
+        return entry
+
+    def _narrow(self, q: str) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """Entry for the longest cached prefix of q, filtered to q (word boundaries don't matter)."""
+        with self._lock:
+            prefixes = [p for p in list(self._entries) if p and q.startswith(p) and self._live(p)]
+            if not prefixes:
+                return None
+            base, complete, _ = self._entries[max(prefixes, key=len)]
+        return [r for r in base if matches(r, q)], complete
+
+    def lookup(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Authoritative results for query, or None if it has to be fetched."""
+        q = normalize(query)
+        with self._lock:
+            entry = self._live(q)
+            if entry is not None:
+                self.stats["exact_hits"] += 1
+                return entry[0]
+        narrowed = self._narrow(q) if self.prefix_aware else None
+        with self._lock:
+            if narrowed is not None and narrowed[1]:
+                # The cached page held every prefix match, so it holds every match of the extension
+                self.stats["prefix_hits"] += 1
+            else:
+                self.stats["misses"] += 1
+                return None
+        self.put(q, *narrowed)
+        return narrowed[0]
+
+    def provisional(self, query: str) -> List[Dict[str, Any]]:
+        """Cached results of a shorter query that still match query; for display only, never cached."""
+        narrowed = self._narrow(normalize(query))
+        return narrowed[0] if narrowed else []
+
+
+class IncrementalSearch:
+    """Per-session canceller in front of a shared PrefixCache."""
+
+    def __init__(self, fetch: Fetcher, cache: PrefixCache):
+        self.fetch = fetch
+        self.cache = cache
+        self.remote_calls = 0
+        self.cancelled = 0
+        self._generation = 0
+        self._current: Optional[Future] = None
+        self._query = ""
+        self._lock = threading.Lock()
+
+    def submit(self, query: str) -> Future:
+        """Start (or reuse) a search for query; any earlier pending search is superseded."""
+        query = query.strip()
+        fut: Future = Future()
+        with self._lock:
+            self._generation += 1
+            gen = self._generation
+            prev, self._current, self._query = self._current, fut, query
+        if prev is not None and not prev.done():
+            self.cancelled += 1
+            prev.cancel()
+
+        if not normalize(query):
+            fut.set_result([])
+            return fut
+        cached = self.cache.lookup(query)
+        if cached is not None:
+            fut.set_result(cached)
+            return fut
+        _POOL.submit(self._run, query, gen, fut)
+        return fut
+
+    def _run(self, query: str, gen: int, fut: Future) -> None:
+        if gen != self._generation or fut.cancelled():
+            return  # superseded while queued: never hits the network
+        try:
+            self.remote_calls += 1
+            results, num_found = self.fetch(query)
+            self.cache.put(query, results, complete=num_found <= len(results))
+            if not fut.cancelled():
+                fut.set_result(results)
+        except Exception as e:
+            if not fut.cancelled():
+                fut.set_exception(e)
+
+    def results(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Results for the latest submitted query (waits up to timeout; [] if none submitted)."""
+        fut = self._current
+        if fut is None:
+            return []
+        return fut.result(timeout=timeout)
+
+    def provisional(self) -> List[Dict[str, Any]]:
+        """Locally narrowed results to show while the latest query is still being fetched."""
+        fut = self._current
+        if fut is None or fut.done():
+            return []
+        return self.cache.provisional(self._query)
+
+    @property
+    def query(self) -> str:
+        return self._query
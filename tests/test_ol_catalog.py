@@ -0,0 +1,83 @@
+import os
+import threading
+
+import pytest
+
+import ol_catalog
+from ol_dump_import import import_dumps
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "ol_dump_sample.txt.gz")
+OL = "https://openlibrary.org"
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    db = str(tmp_path / "ol_catalog.db")
+    counts = import_dumps([FIXTURE], db_path=db)
+    monkeypatch.setattr(ol_catalog, "CATALOG_DB", db)
+    monkeypatch.setattr(ol_catalog, "CATALOG_ONLY", False)
+    monkeypatch.setattr(ol_catalog, "_local", threading.local())  # no connection to another catalog
+    return counts
+
+
+def test_import_counts(catalog):
+    # The redirect and the malformed line are skipped
+    assert catalog == {"/type/author": 2, "/type/work": 3, "/type/edition": 5}
+
+
+@pytest.mark.parametrize("isbn", ["0385121687", "978-0-451-16953-2", "0451169530"])
+def test_isbn(catalog, isbn):
+    ed = ol_catalog.answer(f"{OL}/isbn/{isbn}.json")
+    assert ed["works"] == [{"key": "/works/OL81613W"}]
+    assert "ia_box_id" not in ed and "source_records" not in ed  # trimmed on import
+
+
+def test_isbn_record(catalog):
+    ed = ol_catalog.answer(f"{OL}/isbn/0385121687.json")
+    assert ed["key"] == "/books/OL7343619M"
+    assert ed["title"] == "The Stand"
+    assert ed["publishers"] == ["Doubleday"]
+    assert ed["number_of_pages"] == 823
+
+
+def test_editions_pages(catalog):
+    first = ol_catalog.answer(f"{OL}/works/OL81613W/editions.json?limit=2")
+    rest = ol_catalog.answer(f"{OL}/works/OL81613W/editions.json?limit=2&offset=2")
+    assert first["size"] == rest["size"] == 3
+    assert len(first["entries"]) == 2 and len(rest["entries"]) == 1
+    keys = {e["key"] for e in first["entries"] + rest["entries"]}
+    assert keys == {"/books/OL7343619M", "/books/OL7343620M", "/books/OL9876543M"}
+
+
+def test_search(catalog):
+    payload = ol_catalog.answer(f"{OL}/search.json?q=stand")
+    assert payload["numFound"] == 1
+    doc = payload["docs"][0]
+    assert doc["key"] == "/works/OL81613W"
+    assert doc["author_name"] == ["Stephen King"]
+    assert doc["first_publish_year"] == 1978
+    assert doc["edition_count"] == 3
+
+
+def test_search_num_found_beyond_limit(catalog):
+    payload = ol_catalog.answer(f"{OL}/search.json?q=stephen+king&limit=1")
+    assert len(payload["docs"]) == 1
+    assert payload["numFound"] == 2
+
+
+@pytest.mark.parametrize("url", [
+    f"{OL}/works/OL999W.json",
+    f"{OL}/isbn/9999999999.json",
+    f"{OL}/search.json?q=zzzz",
+    f"{OL}/people/someone.json",
+    "https://covers.openlibrary.org/b/id/8236473-M.jpg",
+    "https://example.com/isbn/0385121687.json",
+])
+def test_unknown_urls(catalog, url):
+    assert ol_catalog.answer(url) is None
+
+
+def test_no_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(ol_catalog, "CATALOG_DB", str(tmp_path / "missing.db"))
+    monkeypatch.setattr(ol_catalog, "_local", threading.local())
+    assert ol_catalog.answer(f"{OL}/isbn/0385121687.json") is None
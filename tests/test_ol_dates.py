@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+
+from ol_dates import EMPTY_KEY, UNKNOWN_KEY, ol_date, ol_date_key, ol_year
+
+
+@pytest.mark.parametrize("raw, key", [
+    ("1998", (1998, 1, 1)),
+    ("1998-01-05", (1998, 1, 5)),
+    ("01/05/1998", (1998, 1, 5)),
+    ("Jan 5, 1998", (1998, 1, 5)),
+    ("January 5th 1998", (1998, 1, 5)),
+    ("5 January 1998", (1998, 1, 5)),
+    ("January 1998", (1998, 1, 1)),
+    ("c1998", (1998, 1, 1)),
+    ("[1965]", (1965, 1, 1)),
+    ("1st ed. 2001", (2001, 1, 1)),
+    ("", EMPTY_KEY),
+    (None, EMPTY_KEY),
+    ("n.d.", UNKNOWN_KEY),
+])
+def test_formats(raw, key):
+    assert ol_date_key(raw) == key
+
+
+@pytest.mark.parametrize("raw, key", [
+    ("1998-02-30", (1998, 2, 1)),
+    ("June 31, 1998", (1998, 6, 1)),
+    ("2001-02-29", (2001, 2, 1)),
+    ("2000-02-29", (2000, 2, 29)),
+    ("1998-13-05", (1998, 1, 1)),
+    ("0000-01-01", UNKNOWN_KEY),
+])
+def test_impossible_dates_degrade_instead_of_raising(raw, key):
+    assert ol_date_key(raw) == key
+    assert ol_date(raw) == datetime(*key)
+
+
+def test_year():
+    assert ol_year("Jan 5, 1998") == 1998
+    assert ol_year("0000-01-01") is None
+    assert ol_year("") is None